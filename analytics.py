@@ -0,0 +1,61 @@
+"""Reports over all saved plans, computed in SQLite.
+
+Everything reads meal_plan_stats, the per-meal totals the saved_plan_slots
+triggers keep current (see schema.sql), so a report costs one pass over the
+planned meals however many plans have been saved. Legacy plans that never
+converted to packed meal ids (db.migrate_saved_plans) have no slots and are
+not counted.
+"""
+from db import read_connection
+from instrumentation import span
+
+TOP_MEALS = 15
+TOP_INGREDIENTS = 20
+
+
+def plan_totals():
+    """Return (saved plans, filled slots, distinct meals planned)."""
+    with span("analytics.plan_totals"), read_connection() as conn:
+        plans = conn.execute("SELECT COUNT(*) FROM saved_plans").fetchone()[0]
+        slots, meals = conn.execute("SELECT COALESCE(SUM(slots), 0), COUNT(*) FROM meal_plan_stats").fetchone()
+        return plans, slots, meals
+
+
+def most_planned_meals(limit=TOP_MEALS):
+    """Return (meal_id, item_name, category, slots, plans) rows, most planned first."""
+    with span("analytics.most_planned_meals") as s, read_connection() as conn:
+        rows = conn.execute("""
+            SELECT s.meal_id, m.item_name, lower(trim(m.category)), s.slots, s.plans
+            FROM meal_plan_stats s JOIN meals m ON m.id = s.meal_id
+            ORDER BY s.slots DESC, s.meal_id
+            LIMIT ?
+        """, (limit,)).fetchall()
+        s["rows"] = len(rows)
+        return rows
+
+
+def ingredient_demand(limit=TOP_INGREDIENTS):
+    """Return (ingredient, slots, meals) rows: how many planned slots need each ingredient, and through how many meals."""
+    with span("analytics.ingredient_demand") as s, read_connection() as conn:
+        rows = conn.execute("""
+            SELECT i.name, SUM(s.slots) AS demand, COUNT(*)
+            FROM meal_plan_stats s
+            JOIN meal_ingredients mi ON mi.meal_id = s.meal_id
+            JOIN ingredients i ON i.id = mi.ingredient_id
+            GROUP BY mi.ingredient_id
+            ORDER BY demand DESC, i.name
+            LIMIT ?
+        """, (limit,)).fetchall()
+        s["rows"] = len(rows)
+        return rows
+
+
+def category_balance():
+    """Return (category, slots, meals) rows for every category that has been planned."""
+    with span("analytics.category_balance"), read_connection() as conn:
+        return conn.execute("""
+            SELECT lower(trim(m.category)) AS category, SUM(s.slots), COUNT(*)
+            FROM meal_plan_stats s JOIN meals m ON m.id = s.meal_id
+            GROUP BY category
+            ORDER BY category
+        """).fetchall()
@@ -0,0 +1,413 @@
+"""JSON HTTP API for plan generation, grocery lists, saved plans and PDFs.
+
+    python -m api [--host 127.0.0.1] [--port 8765]
+
+Runs on asyncio streams from the standard library. Blocking SQLite and
+planning work goes to a small thread pool sized to the connection pool;
+ReportLab rendering goes to a process pool, since it holds the GIL. At most
+MAX_CONCURRENT requests are handled at once; the rest wait up to
+QUEUE_TIMEOUT seconds for a slot and then get 503.
+
+Endpoints (plans are {day: {category: meal}} with days "0"-"6"; a meal is
+its catalog id or an object with an "id"):
+
+    GET  /health
+    POST /plans/generate   {"seed", "pantry", "exclude_ingredients", "categories", "tags", "weeks"}, all optional;
+                           filters are lists or comma-separated strings, pantry needs weeks 1
+    POST /grocery-list     {"plan", "pantry"}
+    GET  /plans            ?before_created_at=&before_id=&limit=
+    POST /plans            {"name", "plan"}; 200 with the existing entry if the week is already saved
+    GET  /plans/<id>
+    GET  /plans/<id>/pdf
+    POST /pdf              {"plan"}
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import re
+import signal
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import db
+from catalog import get_catalog, get_meals_by_id, get_plan, new_seed
+from instrumentation import count, span
+from meal_logic import (
+    CATEGORIES, GroceryIndex, MealHistory, build_multi_week_plan_from_catalog, decode_saved_plan,
+    parse_ingredients, serialize_weekly_plan,
+)
+
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_CONCURRENT = 32
+QUEUE_TIMEOUT = 5.0
+DB_WORKERS = db.POOL_SIZE
+PDF_WORKERS = 2
+MAX_WEEKS = 13
+MAX_BODY = 1 << 20
+MAX_HEADER = 16 << 10
+IDLE_TIMEOUT = 30.0
+
+REASONS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# -----------------------------
+# Plan Encoding
+# -----------------------------
+def encode_plan(weekly_plan):
+    encoded = serialize_weekly_plan(weekly_plan)
+    for day, meals in weekly_plan.items():
+        for category, meal in meals.items():
+            encoded[day][category]["id"] = meal.get("id")
+    return {str(day): meals for day, meals in encoded.items()}
+
+
+def decode_plan(payload, meals_by_id):
+    """Resolve a request plan against the catalog; every meal must carry a known id."""
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "plan must be an object of days")
+    weekly_plan = {day: {} for day in range(7)}
+    for day, meals in payload.items():
+        if not str(day).isdigit() or int(day) not in weekly_plan or not isinstance(meals, dict):
+            raise HTTPError(400, f"invalid plan day: {day!r}")
+        for category, meal in meals.items():
+            if category not in CATEGORIES:
+                raise HTTPError(400, f"invalid meal category: {category!r}")
+            meal_id = meal.get("id") if isinstance(meal, dict) else meal
+            if isinstance(meal_id, bool) or not isinstance(meal_id, int) or meal_id not in meals_by_id:
+                raise HTTPError(400, f"unknown meal id: {meal_id!r}")
+            weekly_plan[int(day)][category] = meals_by_id[meal_id]
+    return weekly_plan
+
+
+def decode_names(body, key):
+    """Read a list of names, or a comma-separated string of them, from the request body."""
+    value = body.get(key)
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return parse_ingredients(value)
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise HTTPError(400, f"{key} must be a list of strings or a comma-separated string")
+    return value
+
+
+def decode_int(body, key, default, low, high):
+    """Read an integer in [low, high] from the request body; JSON booleans and floats are refused."""
+    value = body.get(key)
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+        raise HTTPError(400, f"{key} must be an integer between {low} and {high}")
+    return value
+
+
+def query_int(query, key, default, low):
+    """Read a non-negative integer of at least low from the query string."""
+    value = query.get(key)
+    if value is None:
+        return default
+    if not (value.isascii() and value.isdigit()) or int(value) < low:
+        raise HTTPError(400, f"{key} must be an integer of at least {low}")
+    return int(value)
+
+
+# -----------------------------
+# Blocking Work (run in executors)
+# -----------------------------
+def generate_plan(body):
+    filters = db.meal_filters(
+        exclude_ingredients=decode_names(body, "exclude_ingredients") or (),
+        categories=decode_names(body, "categories"),
+        tags=decode_names(body, "tags") or (),
+    )
+    seed = body.get("seed")
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int)):
+        raise HTTPError(400, "seed must be an integer")
+    weeks = decode_int(body, "weeks", 1, 1, MAX_WEEKS)
+    pantry = decode_names(body, "pantry")
+    if weeks > 1:
+        if pantry:
+            # The pantry planner builds single weeks; it cannot also skip recent meals.
+            raise HTTPError(400, "pantry is only supported when weeks is 1")
+        # Consecutive weeks that also avoid the most recently saved ones.
+        rng = random.Random(seed) if seed is not None else random
+        history = MealHistory(db.HISTORY_WINDOW, reversed(db.fetch_recent_meal_ids(db.HISTORY_WINDOW)))
+        plans = build_multi_week_plan_from_catalog(get_catalog(filters), weeks, history, rng)
+        return {"plans": [encode_plan(plan) for plan in plans]}
+    # Single weeks are always seeded, so the response can be reproduced (and is cached).
+    seed = new_seed() if seed is None else seed
+    return {"seed": seed, "plan": encode_plan(get_plan(seed, filters, pantry))}
+
+
+def grocery_list(body):
+    from pantry import normalize_pantry
+
+    index = GroceryIndex(decode_plan(body.get("plan"), get_meals_by_id()))
+    pantry = normalize_pantry(decode_names(body, "pantry") or ())
+    return {
+        "items": [
+            {"ingredient": ingredient, "meals": index.meals_for(ingredient)}
+            for ingredient in index.grocery_list() if ingredient not in pantry
+        ]
+    }
+
+
+def list_plans(query):
+    limit = min(query_int(query, "limit", db.SAVED_PLANS_PAGE_SIZE, 1), 100)
+    before = None
+    if "before_created_at" in query and "before_id" in query:
+        before = (query["before_created_at"], query_int(query, "before_id", None, 0))
+    rows = db.fetch_saved_plan_page(limit, before)
+    return {"plans": [{"id": plan_id, "name": name, "created_at": created} for plan_id, name, created in rows]}
+
+
+def save_plan(body):
+    name = body.get("name")
+    name = name.strip() if isinstance(name, str) else ""
+    if not name:
+        raise HTTPError(400, "name is required")
+    plan = decode_plan(body.get("plan"), get_meals_by_id())
+    saved = db.save_weekly_plan(name, plan)
+    # An identical week is stored once; the answer names the entry it was saved as.
+    return {"id": saved.id, "name": saved.name, "duplicate": not saved.created}
+
+
+def load_plan(plan_id):
+    row = db.fetch_saved_plan(plan_id)
+    if row is None:
+        raise HTTPError(404, f"no saved plan {plan_id}")
+    return decode_saved_plan(*row, get_meals_by_id())
+
+
+def resolve_plan(body):
+    return decode_plan(body.get("plan"), get_meals_by_id())
+
+
+def render(weekly_plan):
+    # Imported in the worker so the API process never loads ReportLab itself.
+    from pdf_generator import generate_pdf
+
+    return generate_pdf(weekly_plan)
+
+
+# -----------------------------
+# Application
+# -----------------------------
+class App:
+    def __init__(self, max_concurrent=MAX_CONCURRENT, db_workers=DB_WORKERS, pdf_workers=PDF_WORKERS):
+        self.db_executor = ThreadPoolExecutor(db_workers, thread_name_prefix="api-db")
+        # spawn, not fork: the parent has executor threads and open SQLite connections.
+        self.pdf_executor = ProcessPoolExecutor(pdf_workers, mp_context=multiprocessing.get_context("spawn"))
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.routes = [
+            ("GET", re.compile(r"/health"), self.health),
+            ("POST", re.compile(r"/plans/generate"), self.generate),
+            ("POST", re.compile(r"/grocery-list"), self.grocery_list),
+            ("GET", re.compile(r"/plans"), self.list_plans),
+            ("POST", re.compile(r"/plans"), self.save_plan),
+            ("GET", re.compile(r"/plans/(\d+)"), self.load_plan),
+            ("GET", re.compile(r"/plans/(\d+)/pdf"), self.saved_pdf),
+            ("POST", re.compile(r"/pdf"), self.pdf),
+        ]
+
+    def close(self):
+        self.db_executor.shutdown(wait=False, cancel_futures=True)
+        # Wait so the render processes exit with the server instead of lingering.
+        self.pdf_executor.shutdown(wait=True, cancel_futures=True)
+
+    async def blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.db_executor, fn, *args)
+
+    async def render(self, weekly_plan):
+        return await asyncio.get_running_loop().run_in_executor(self.pdf_executor, render, weekly_plan)
+
+    # ---- handlers: (request) -> (status, payload) ----
+    async def health(self, request):
+        return 200, {"status": "ok"}
+
+    async def generate(self, request):
+        return 200, await self.blocking(generate_plan, request["json"])
+
+    async def grocery_list(self, request):
+        return 200, await self.blocking(grocery_list, request["json"])
+
+    async def list_plans(self, request):
+        return 200, await self.blocking(list_plans, request["query"])
+
+    async def save_plan(self, request):
+        result = await self.blocking(save_plan, request["json"])
+        return (200 if result["duplicate"] else 201), result
+
+    async def load_plan(self, request, plan_id):
+        return 200, {"id": int(plan_id), "plan": encode_plan(await self.blocking(load_plan, int(plan_id)))}
+
+    async def saved_pdf(self, request, plan_id):
+        return 200, await self.render(await self.blocking(load_plan, int(plan_id)))
+
+    async def pdf(self, request):
+        return 200, await self.render(await self.blocking(resolve_plan, request["json"]))
+
+    # ---- dispatch ----
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(url.path)
+            if match is None:
+                continue
+            allowed = True
+            if route_method != method:
+                continue
+            request = {
+                "query": {k: v[-1] for k, v in parse_qs(url.query).items()},
+                "json": parse_json(body) if method == "POST" else None,
+            }
+            return await handler(request, *match.groups())
+        raise HTTPError(405 if allowed else 404, f"{method} {url.path} not allowed" if allowed else "not found")
+
+    async def handle(self, method, target, body):
+        try:
+            await asyncio.wait_for(self.slots.acquire(), QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            count("api.rejected")
+            return 503, {"error": "server busy, retry later"}
+        try:
+            with span("api.request", method=method, path=urlsplit(target).path) as s:
+                try:
+                    status, payload = await self.dispatch(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                s["status"] = status
+                return status, payload
+        finally:
+            self.slots.release()
+
+
+def parse_json(body):
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(400, "request body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "request body must be a JSON object")
+    return payload
+
+
+# -----------------------------
+# HTTP/1.1 Server
+# -----------------------------
+async def read_request(reader):
+    """Return (method, target, headers, body), or None when the client closed the connection."""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(413, "request headers too large")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    length = headers.get("content-length") or "0"
+    if not (length.isascii() and length.isdigit()):
+        raise HTTPError(400, "invalid Content-Length")
+    length = int(length)
+    if length > MAX_BODY:
+        raise HTTPError(413, "request body too large")
+    try:
+        body = await reader.readexactly(length) if length else b""
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None  # the client went away mid-body
+    return method.upper(), target, headers, body
+
+
+def write_response(writer, status, payload, keep_alive):
+    if isinstance(payload, bytes):
+        body, content_type = payload, "application/pdf"
+    else:
+        body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+    )
+    if status == 503:
+        head += "Retry-After: 1\r\n"
+    writer.write(head.encode("latin-1") + b"\r\n" + body)
+
+
+async def serve_connection(app, reader, writer):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except HTTPError as e:
+                write_response(writer, e.status, {"error": e.message}, False)
+                await writer.drain()
+                return
+            if request is None:
+                return
+            method, target, headers, body = request
+            keep_alive = headers.get("connection", "").lower() != "close"
+            try:
+                status, payload = await app.handle(method, target, body)
+            except Exception as e:  # never drop the connection without an answer
+                status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+            write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                return
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=HOST, port=PORT, max_concurrent=MAX_CONCURRENT):
+    app = App(max_concurrent)
+    server = await asyncio.start_server(
+        lambda r, w: serve_connection(app, r, w), host, port, limit=MAX_HEADER
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    print(f"🍽 Meal planner API on http://{host}:{port}", flush=True)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        app.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the meal planner JSON API.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-concurrent", type=int, default=MAX_CONCURRENT, help="requests handled at once")
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.host, args.port, args.max_concurrent))
+
+
+if __name__ == "__main__":
+    main()
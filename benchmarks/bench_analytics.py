@@ -0,0 +1,121 @@
+"""Time the analytics reports against decoding every saved plan in Python.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_analytics [--meals 20000] [--plans 100000]
+
+Builds a scratch database with --meals synthetic meals and --plans saved
+weeks whose slots are drawn uniformly from the catalog (the worst case for
+meal_plan_stats: nearly every meal gets planned). Reports each report's
+latency next to the old approach of loading and decoding every plan, then
+the cost the stats triggers add to save_weekly_plan.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+import analytics
+import db
+from benchmarks.synthetic import write_catalog_db
+from meal_logic import CATEGORIES, PLAN_SLOTS, build_catalog, build_weekly_plan_from_catalog, decode_saved_plan
+
+
+def timed(fn, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def random_packed_plans(catalog, n, rng):
+    ids = [[meal["id"] for meal in catalog.get(category, [])] for category in CATEGORIES]
+    for _ in range(n):
+        yield PLAN_SLOTS.pack(*(rng.choice(ids[c]) for _ in range(7) for c in range(len(CATEGORIES))))
+
+
+def insert_plans(packed_plans):
+    created_at = datetime.now().isoformat(timespec="seconds")
+    with db.write_connection() as conn:
+        for plan_meals in packed_plans:
+            cursor = conn.execute(
+                "INSERT INTO saved_plans (name, created_at, plan_meals) VALUES (?, ?, ?)",
+                ("bench", created_at, plan_meals),
+            )
+            db.insert_plan_slots(conn, cursor.lastrowid, plan_meals)
+
+
+def save_latency(catalog, saves, seed):
+    # A fresh seed per run: repeating a week would only hit the duplicate check.
+    rng = random.Random(seed)
+    plans = [build_weekly_plan_from_catalog(catalog, rng) for _ in range(saves)]
+    start = time.perf_counter()
+    for plan in plans:
+        db.save_weekly_plan("bench", plan)
+    return (time.perf_counter() - start) / saves * 1000
+
+
+def python_reports(meals_by_id):
+    # The pre-analytics way: every plan loaded and decoded, then counted in Python.
+    with db.read_connection() as conn:
+        rows = conn.execute("SELECT plan_json, plan_meals FROM saved_plans").fetchall()
+    meal_slots, ingredient_slots, category_slots = Counter(), Counter(), Counter()
+    for plan_json, plan_meals in rows:
+        for meals in decode_saved_plan(plan_json, plan_meals, meals_by_id).values():
+            for meal in meals.values():
+                meal_slots[meal["id"]] += 1
+                category_slots[meal["category"]] += 1
+                ingredient_slots.update(meal["ingredients"])
+    return meal_slots, ingredient_slots, category_slots
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--meals", type=int, default=20_000)
+    parser.add_argument("--plans", type=int, default=100_000)
+    parser.add_argument("--saves", type=int, default=200, help="save_weekly_plan calls to time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "meals.db")
+        write_catalog_db(db.DB_PATH, args.meals)
+        catalog = build_catalog(db.fetch_meals())
+        meals_by_id = {meal["id"]: meal for meals in catalog.values() for meal in meals}
+
+        start = time.perf_counter()
+        insert_plans(random_packed_plans(catalog, args.plans, random.Random(0)))
+        print(f"meals={args.meals} plans={args.plans} inserted in {time.perf_counter() - start:.1f} s")
+
+        (meal_slots, ingredient_slots, category_slots), python_ms = timed(lambda: python_reports(meals_by_id), 1)
+        print(f"\n{'report':<22}{'ms':>9}")
+        for name, report in [
+            ("plan_totals", analytics.plan_totals),
+            ("most_planned_meals", analytics.most_planned_meals),
+            ("ingredient_demand", analytics.ingredient_demand),
+            ("category_balance", analytics.category_balance),
+        ]:
+            _, ms = timed(report)
+            print(f"{name:<22}{ms:>9.1f}")
+        print(f"{'decode all (python)':<22}{python_ms:>9.1f}")
+
+        assert analytics.most_planned_meals(1)[0][3] == max(meal_slots.values())
+        assert {c: slots for c, slots, _ in analytics.category_balance()} == dict(category_slots)
+        for name, slots, _ in analytics.ingredient_demand():
+            assert slots == ingredient_slots[name], name
+
+        with_stats = save_latency(catalog, args.saves, 1)
+        with db.write_connection() as conn:
+            conn.execute("DROP TRIGGER saved_plan_slots_after_insert")
+        without_stats = save_latency(catalog, args.saves, 2)
+        print(f"\nsave_weekly_plan: {with_stats:.2f} ms with stats triggers, {without_stats:.2f} ms without")
+        db.close_pools()
+
+
+if __name__ == "__main__":
+    main()
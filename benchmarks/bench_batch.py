@@ -0,0 +1,41 @@
+"""Measure batch plan throughput (plans/sec) against worker count.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_batch [--plans 20000] [--meals 20000]
+"""
+import argparse
+import os
+import time
+
+from benchmarks.synthetic import synthetic_rows
+from meal_logic import build_catalog, build_weekly_plans_from_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plans", type=int, default=20_000)
+    parser.add_argument("--meals", type=int, default=20_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    catalog = build_catalog(synthetic_rows(args.meals, vocab=1500))
+    print(f"catalog of {args.meals} meals built once in {time.perf_counter() - start:.2f} s")
+
+    seeds = list(range(args.plans))
+    reference = None
+    cores = os.cpu_count() or 1
+    workers = sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+    print(f"{'workers':>8}{'seconds':>10}{'plans/sec':>12}")
+    for count in workers:
+        start = time.perf_counter()
+        plans = build_weekly_plans_from_catalog(catalog, args.plans, seeds=seeds, workers=count)
+        elapsed = time.perf_counter() - start
+        ids = [[m["id"] for day in p.values() for m in day.values()] for p in plans]
+        assert reference is None or ids == reference, "seeded plans differ across worker counts"
+        reference = ids
+        print(f"{count:>8}{elapsed:>10.2f}{args.plans / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compare connect-per-call SQLite access with the pooled connection layer.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_db [--calls 2000] [--threads 8]
+
+Works on a scratch copy of meals.db so the real database is never touched.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+
+QUERY = "SELECT item_name, category, ingredients, notes FROM meals"
+
+
+def connect_per_call(path):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute(QUERY)
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def pooled(path):
+    with db.get_pool(path).reader() as conn:
+        return conn.execute(QUERY).fetchall()
+
+
+def run(fn, path, calls, threads):
+    start = time.perf_counter()
+    if threads == 1:
+        for _ in range(calls):
+            fn(path)
+    else:
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(lambda _: fn(path), range(calls)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "meals.db")
+        shutil.copyfile(db.DB_PATH, path)
+        db.get_pool(path)
+
+        print(f"{'mode':<18}{'threads':>8}{'total s':>10}{'per call us':>14}")
+        for threads in (1, args.threads):
+            for label, fn in (("connect-per-call", connect_per_call), ("pooled", pooled)):
+                elapsed = run(fn, path, args.calls, threads)
+                print(f"{label:<18}{threads:>8}{elapsed:>10.3f}{elapsed / args.calls * 1e6:>14.1f}")
+        db.close_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Memory held by the catalog and by each user session, measured with tracemalloc.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_memory [--meals 100000] [--sessions 200]
+
+The catalog is built from synthetic rows the way catalog.CatalogCache builds
+it (rows dropped afterwards). A session holds what streamlit_app keeps in
+session state: the current week, its grocery index, four planned weeks and
+one saved week loaded back from its JSON copy.
+"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+import incidence
+from benchmarks.synthetic import synthetic_rows
+from meal_logic import (
+    GroceryIndex, MealHistory, build_catalog, build_multi_week_plan_from_catalog,
+    build_weekly_plan_from_catalog, copy_plan, deserialize_weekly_plan, serialize_weekly_plan,
+)
+
+
+def traced_bytes(build):
+    # Bytes still allocated once build() has returned and garbage is collected.
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def build_session(catalog, seed):
+    rng = random.Random(seed)
+    plan = copy_plan(build_weekly_plan_from_catalog(catalog, rng))
+    saved = deserialize_weekly_plan(json.dumps(serialize_weekly_plan(
+        build_weekly_plan_from_catalog(catalog, rng)
+    )))
+    return {
+        "weekly_plan": plan,
+        "grocery_index": GroceryIndex(plan),
+        "planned_weeks": build_multi_week_plan_from_catalog(catalog, 4, MealHistory(4), rng),
+        "loaded_plan": saved,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--meals", type=int, default=100_000)
+    parser.add_argument("--sessions", type=int, default=200)
+    args = parser.parse_args()
+
+    # Import NumPy (used by rank_meals on large catalogs) before tracing starts.
+    incidence.available()
+
+    # Rows are generated untraced; the traced step copies them the way
+    # db.fetch_meals allocates them (fresh tuples of shared strings).
+    rows = synthetic_rows(args.meals)
+    catalog, catalog_bytes = traced_bytes(lambda: build_catalog([
+        (meal_id, name, category, tuple(list(ingredients)), notes)
+        for meal_id, name, category, ingredients, notes in rows
+    ]))
+    meals = sum(len(ranked) for ranked in catalog.values())
+    sessions, session_bytes = traced_bytes(
+        lambda: [build_session(catalog, seed) for seed in range(args.sessions)]
+    )
+    per_session = session_bytes / len(sessions)
+    print(f"catalog: {meals} meals, {catalog_bytes / 2**20:.1f} MiB ({catalog_bytes / meals:.0f} B/meal)")
+    print(f"sessions: {len(sessions)}, {per_session / 1024:.1f} KiB each")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Compare pantry queries on the inverted index with a per-meal set scan.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pantry [--meals 100000] [--pantry 40] [--k 2]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.synthetic import synthetic_rows, vocab_size, vocabulary
+from meal_logic import build_catalog, build_grocery_list, build_weekly_plan_from_catalog
+from pantry import PantryIndex, build_pantry_indexes, build_pantry_plan
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def scan(meals, pantry, k):
+    return [meal for meal in meals if sum(i not in pantry for i in meal["ingredients"]) <= k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--meals", type=int, default=100_000)
+    parser.add_argument("--pantry", type=int, default=40, help="pantry size, drawn from common ingredients")
+    parser.add_argument("--k", type=int, default=2, help="largest number of missing ingredients to query")
+    parser.add_argument("--plans", type=int, default=20)
+    args = parser.parse_args()
+
+    catalog = build_catalog(synthetic_rows(args.meals))
+    meals = [meal for ranked in catalog.values() for meal in ranked]
+    vocab = vocabulary(vocab_size(args.meals))
+    rng = random.Random(0)
+    pantry = set(rng.sample(vocab[:args.pantry * 5], args.pantry))
+
+    index, build_ms = timed(PantryIndex, meals)
+    print(f"meals={args.meals} pantry={len(pantry)} index build {build_ms:.1f} ms")
+    for k in range(args.k + 1):
+        found, index_ms = timed(index.missing_at_most, pantry, k)
+        expected, scan_ms = timed(scan, meals, pantry, k)
+        assert [m["id"] for m in found] == [m["id"] for m in expected]
+        print(f"missing <= {k}: {len(found):7d} meals  index {index_ms:7.1f} ms  scan {scan_ms:7.1f} ms")
+
+    indexes = build_pantry_indexes(catalog)
+    default_sizes, pantry_sizes, plan_ms = [], [], []
+    for seed in range(args.plans):
+        plan = build_weekly_plan_from_catalog(catalog, random.Random(seed))
+        default_sizes.append(len(build_grocery_list(plan, pantry)))
+        start = time.perf_counter()
+        plan = build_pantry_plan(indexes, pantry, random.Random(seed))
+        plan_ms.append((time.perf_counter() - start) * 1000)
+        pantry_sizes.append(len(build_grocery_list(plan, pantry)))
+    print(
+        f"grocery items to buy: default {sum(default_sizes) / args.plans:.1f}, "
+        f"pantry mode {sum(pantry_sizes) / args.plans:.1f} "
+        f"({sum(plan_ms) / args.plans:.1f} ms per pantry plan)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Time and measure allocations of PDF rendering, split into our code and ReportLab's.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pdf [--renders 50]
+
+"story" is pdf_generator.build_story (flowable assembly, our code);
+"build" is build_document (ReportLab layout and PDF serialization).
+The PDF cache is bypassed so every iteration is a full render. The catalog
+is read from a scratch copy of meals.db, so the tracked file is never migrated.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import db
+from meal_logic import build_catalog, build_weekly_plans_from_catalog
+from pdf_generator import build_document, build_story
+
+
+def measure(fn, arg):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(arg)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "meals.db")
+        shutil.copyfile(db.DB_PATH, path)
+        db.DB_PATH = path
+        catalog = build_catalog(db.fetch_meals())
+        db.close_pools()
+    plans = build_weekly_plans_from_catalog(catalog, args.renders, seeds=list(range(args.renders)))
+    build_document(build_story(plans[0]))  # warm up fonts and module-level styles
+
+    timings = {"story": [], "build": []}
+    peaks = {"story": [], "build": []}
+    # Timing is taken without tracemalloc, which slows allocation-heavy code.
+    for plan in plans:
+        start = time.perf_counter()
+        story = build_story(plan)
+        timings["story"].append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        build_document(story)
+        timings["build"].append((time.perf_counter() - start) * 1000)
+    for plan in plans[:10]:
+        story, _, peak = measure(build_story, plan)
+        peaks["story"].append(peak)
+        _, _, peak = measure(build_document, story)
+        peaks["build"].append(peak)
+
+    print(f"{'phase':<8}{'median ms':>11}{'p95 ms':>9}{'peak KiB':>10}")
+    for phase in ("story", "build"):
+        samples = sorted(timings[phase])
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        print(f"{phase:<8}{statistics.median(samples):>11.2f}{p95:>9.2f}{statistics.median(peaks[phase]):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
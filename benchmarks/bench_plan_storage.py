@@ -0,0 +1,68 @@
+"""Compare legacy JSON saved plans with the compact packed meal-id format.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_plan_storage [--plans 10000]
+
+Reports bytes per plan, on-disk size for --plans rows, and decode time per plan.
+The catalog is read from a scratch copy of meals.db.
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import db
+from meal_logic import (
+    build_catalog, build_weekly_plans_from_catalog, decode_saved_plan, pack_weekly_plan, serialize_weekly_plan
+)
+
+
+def table_size(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE saved_plans (id INTEGER PRIMARY KEY, plan_json TEXT, plan_meals BLOB)")
+    with conn:
+        conn.executemany("INSERT INTO saved_plans (plan_json, plan_meals) VALUES (?, ?)", rows)
+    conn.execute("VACUUM")
+    conn.close()
+    return os.path.getsize(path)
+
+
+def decode_time(rows, meals_by_id):
+    start = time.perf_counter()
+    for plan_json, plan_meals in rows:
+        decode_saved_plan(plan_json, plan_meals, meals_by_id)
+    return (time.perf_counter() - start) / len(rows) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plans", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "meals.db")
+        shutil.copyfile(db.DB_PATH, path)
+        db.DB_PATH = path
+        catalog = build_catalog(db.fetch_meals())
+        db.close_pools()
+        meals_by_id = {meal["id"]: meal for meals in catalog.values() for meal in meals}
+        plans = build_weekly_plans_from_catalog(catalog, args.plans, seeds=list(range(args.plans)))
+
+        legacy = [(json.dumps(serialize_weekly_plan(plan)), None) for plan in plans]
+        compact = [(None, pack_weekly_plan(plan)) for plan in plans]
+        legacy_disk = table_size(os.path.join(tmp, "legacy.db"), legacy)
+        compact_disk = table_size(os.path.join(tmp, "compact.db"), compact)
+
+    legacy_bytes = sum(len(j) for j, _ in legacy) / len(legacy)
+    compact_bytes = sum(len(b) for _, b in compact) / len(compact)
+    print(f"{'format':<10}{'bytes/plan':>12}{'db size KiB':>14}{'decode us/plan':>16}")
+    print(f"{'json':<10}{legacy_bytes:>12.0f}{legacy_disk / 1024:>14.0f}{decode_time(legacy, meals_by_id):>16.1f}")
+    print(f"{'packed':<10}{compact_bytes:>12.0f}{compact_disk / 1024:>14.0f}{decode_time(compact, meals_by_id):>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
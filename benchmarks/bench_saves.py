@@ -0,0 +1,87 @@
+"""Compare one transaction per save with the write-behind save queue.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_saves [--threads 8] [--saves 250]
+
+Each of --threads threads saves --saves distinct weeks into a scratch copy
+of meals.db, first committing each save on its own (the old
+save_weekly_plan), then through db.queue_weekly_plan (returns at once) and
+db.save_weekly_plan (waits for the commit). Reports throughput and how long
+the caller is blocked per save.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import db
+from catalog import get_catalog
+from meal_logic import build_weekly_plan_from_catalog, pack_weekly_plan
+
+
+def direct_save(name, weekly_plan):
+    with db.write_connection() as conn:
+        return db.insert_saved_plan(conn, name, datetime.now().isoformat(), None, pack_weekly_plan(weekly_plan))
+
+
+def run(threads, plans, save):
+    blocked = []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        samples = []
+        for plan in chunk:
+            start = time.perf_counter()
+            save("bench", plan)
+            samples.append((time.perf_counter() - start) * 1000)
+        with lock:
+            blocked.extend(samples)
+
+    chunks = [plans[i::threads] for i in range(threads)]
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    db.flush_saves()
+    elapsed = time.perf_counter() - start
+    return len(plans) / elapsed, statistics.median(blocked), max(blocked)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--saves", type=int, default=250, help="saves per thread")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "meals.db")
+        shutil.copyfile(db.DB_PATH, path)
+        db.DB_PATH = path
+        catalog = get_catalog()
+        rng = random.Random(0)
+        total = args.threads * args.saves
+        # Distinct weeks, so the comparison is not flattered by deduplication.
+        plans = [build_weekly_plan_from_catalog(catalog, rng) for _ in range(3 * total)]
+
+        print(f"{args.threads} threads x {args.saves} saves")
+        print(f"{'path':<14}{'saves/s':>9}{'blocked p50 ms':>16}{'blocked max ms':>16}")
+        for name, save, batch in [
+            ("direct", direct_save, plans[:total]),
+            ("queued", db.queue_weekly_plan, plans[total:2 * total]),
+            ("queued + ack", db.save_weekly_plan, plans[2 * total:]),
+        ]:
+            rate, p50, worst = run(args.threads, batch, save)
+            print(f"{name:<14}{rate:>9.0f}{p50:>16.3f}{worst:>16.3f}")
+        db.close_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Cold-start import cost of the entry points, measured with python -X importtime.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup                    # compare with the stored baseline
+    python -m benchmarks.bench_startup --update-baseline  # accept current numbers
+    python -m benchmarks.bench_startup --top 15           # also list the heaviest imports
+
+Each entry point is started in a fresh interpreter several times; the median
+total import time and wall time are compared with the "startup" section of
+benchmarks/baseline.json, like the suite does for pipeline stages. Modules
+that must stay lazy (ReportLab outside PDF rendering, Altair outside the
+insights tab) fail the run if an entry point imports them at startup.
+
+The interpreters run in a scratch directory holding copies of meals.db and
+styles.css, so opening (and migrating) the database never touches the
+tracked copy.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.suite import BASELINE_PATH
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Files the entry points open relative to the working directory.
+DATA_FILES = ["meals.db", "styles.css"]
+
+# name -> (code run at startup, top-level packages it must not import)
+TARGETS = {
+    "script": ("import script", ["reportlab"]),
+    "api": ("import api", ["reportlab"]),
+    # Streamlit's bare mode: runs the whole app script once without a server.
+    "streamlit_app": (f"import runpy; runpy.run_path({os.path.join(ROOT, 'streamlit_app.py')!r})", ["reportlab", "altair"]),
+}
+ABSOLUTE_SLACK_MS = 20.0
+
+
+def parse_importtime(stderr):
+    """Return {module: (self_us, cumulative_us, depth)} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def scratch_env(tmp):
+    """Copy DATA_FILES into tmp; return the environment that still imports the repo's modules."""
+    for filename in DATA_FILES:
+        shutil.copyfile(os.path.join(ROOT, filename), os.path.join(tmp, filename))
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+
+
+def measure(code, repeat, cwd, env):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=cwd, env=env, capture_output=True, text=True,
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            raise SystemExit(f"{code!r} failed:\n{result.stderr[-2000:]}")
+        samples.append((wall_ms, parse_importtime(result.stderr)))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="show the N heaviest imports per entry point")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown, 0.5 = 50%%")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    base_startup = baseline.get("startup", {})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = scratch_env(tmp)
+        # Open the scratch database once so no timed run pays for migrating it.
+        measure("import db; db.fetch_meals(); db.close_pools()", 1, tmp, env)
+        samples_by_target = {name: measure(code, args.repeat, tmp, env) for name, (code, _) in TARGETS.items()}
+
+    results, failures = {}, []
+    print(f"{'entry point':<16}{'import ms':>11}{'wall ms':>10}{'baseline':>10}")
+    for name, (_, forbidden) in TARGETS.items():
+        samples = samples_by_target[name]
+        import_ms = statistics.median(
+            sum(cumulative for _, cumulative, depth in modules.values() if depth == 0) / 1000
+            for _, modules in samples
+        )
+        wall_ms = statistics.median(wall for wall, _ in samples)
+        results[name] = {"import_ms": round(import_ms, 1), "wall_ms": round(wall_ms, 1)}
+
+        base = base_startup.get(name, {}).get("import_ms")
+        base_text = f"{base:.1f}" if base is not None else "-"
+        print(f"{name:<16}{import_ms:>11.1f}{wall_ms:>10.1f}{base_text:>10}")
+        if base is not None and import_ms > base * (1 + args.tolerance) + ABSOLUTE_SLACK_MS:
+            failures.append(f"{name}: imports take {import_ms:.1f} ms vs baseline {base:.1f} ms")
+
+        modules = samples[-1][1]
+        loaded = sorted({m.split(".")[0] for m in modules} & set(forbidden))
+        if loaded:
+            failures.append(f"{name}: imports {', '.join(loaded)} at startup")
+        if args.top:
+            heaviest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+            for module, (self_us, cumulative_us, _) in heaviest:
+                print(f"    {module:<40}{self_us / 1000:>8.1f} ms self{cumulative_us / 1000:>9.1f} ms total")
+
+    if args.update_baseline:
+        baseline["startup"] = results
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline updated: {args.baseline}")
+        return
+
+    if failures:
+        print("\nRegressions:")
+        for line in failures:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline}" if base_startup else "\nNo startup baseline to compare against.")
+
+
+if __name__ == "__main__":
+    main()
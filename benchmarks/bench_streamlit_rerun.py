@@ -0,0 +1,77 @@
+"""Measure Streamlit rerun latency: full-script reruns vs. fragment-scoped tab reruns.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_streamlit_rerun [--runs 20]
+
+Uses streamlit.testing's AppTest, which always reruns the whole script, so
+each tab fragment is timed separately by wrapping st.fragment. A grocery
+checkbox tick in the live app reruns only the grocery fragment; before the
+tabs were fragments, it cost a full-script rerun. The app runs in-process
+against a scratch copy of meals.db, so its saves never reach the tracked file.
+"""
+import argparse
+import functools
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import db
+
+fragment_ms = defaultdict(list)
+
+
+def install_fragment_timer():
+    real_fragment = st.fragment
+
+    def timed_fragment(func=None, **kwargs):
+        def decorate(f):
+            @functools.wraps(f)
+            def timed(*args, **kw):
+                start = time.perf_counter()
+                try:
+                    return f(*args, **kw)
+                finally:
+                    fragment_ms[f.__name__].append((time.perf_counter() - start) * 1000)
+            return real_fragment(timed, **kwargs)
+        return decorate(func) if func is not None else decorate
+
+    st.fragment = timed_fragment
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    install_fragment_timer()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "meals.db")
+        shutil.copyfile(db.DB_PATH, path)
+        db.DB_PATH = path
+        app = AppTest.from_file("../streamlit_app.py", default_timeout=60)
+        app.run()
+        fragment_ms.clear()
+
+        full_ms = []
+        for i in range(args.runs):
+            checkbox = app.checkbox[i % len(app.checkbox)]
+            start = time.perf_counter()
+            checkbox.check().run()
+            full_ms.append((time.perf_counter() - start) * 1000)
+        db.close_pools()
+
+    print(f"{'scope':<36}{'median ms':>11}")
+    print(f"{'full script rerun':<36}{statistics.median(full_ms):>11.2f}")
+    for name, samples in sorted(fragment_ms.items()):
+        print(f"{name + ' fragment':<36}{statistics.median(samples):>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
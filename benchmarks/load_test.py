@@ -0,0 +1,162 @@
+"""Closed-loop load test for the JSON API (api.py) on localhost.
+
+Run from the repository root, against a running server or one it starts:
+
+    python -m api --port 8765 &
+    python -m benchmarks.load_test [--port 8765] [--clients 32] [--duration 10]
+    python -m benchmarks.load_test --start          # start a server on a scratch copy of meals.db
+
+Each client keeps one keep-alive connection and sends the next request as
+soon as the previous answer arrives, cycling through a weighted mix of
+endpoints. Reports throughput, latency percentiles and status counts per
+endpoint. Saves are excluded unless --writes is given.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+# (weight, name); requests are drawn from this mix.
+MIX = [
+    (40, "generate"),
+    (30, "grocery-list"),
+    (15, "list-plans"),
+    (10, "load-plan"),
+    (5, "pdf"),
+]
+
+
+async def request(reader, writer, method, path, body=None):
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(payload)}\r\n\r\n".encode("latin-1")
+        + payload
+    )
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    length = next(int(line.split(":", 1)[1]) for line in lines if line.lower().startswith("content-length"))
+    return status, await reader.readexactly(length)
+
+
+def build_request(name, rng, plan, plan_ids):
+    if name == "generate":
+        return "POST", "/plans/generate", {"seed": rng.getrandbits(32)}
+    if name == "grocery-list":
+        return "POST", "/grocery-list", {"plan": plan}
+    if name == "list-plans":
+        return "GET", "/plans?limit=20", None
+    if name == "load-plan" and plan_ids:
+        return "GET", f"/plans/{rng.choice(plan_ids)}", None
+    if name == "save":
+        return "POST", "/plans", {"name": "load test", "plan": plan}
+    return "POST", "/pdf", {"plan": plan}
+
+
+async def client(host, port, deadline, mix, seed, plan, plan_ids, results):
+    rng = random.Random(seed)
+    names = [name for _, name in mix]
+    weights = [weight for weight, _ in mix]
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body = build_request(name, rng, plan, plan_ids)
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, method, path, body)
+            results[name].append((time.perf_counter() - start, status))
+    finally:
+        writer.close()
+
+
+async def run(host, port, clients, duration, writes):
+    reader, writer = await asyncio.open_connection(host, port)
+    status, body = await request(reader, writer, "POST", "/plans/generate", {"seed": 0})
+    if status != 200:
+        raise SystemExit(f"server answered {status} to /plans/generate: {body[:200]!r}")
+    plan = json.loads(body)["plan"]
+    _, body = await request(reader, writer, "GET", "/plans?limit=100")
+    plan_ids = [p["id"] for p in json.loads(body)["plans"]]
+    writer.close()
+
+    mix = MIX + [(5, "save")] if writes else MIX
+    results = defaultdict(list)
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        client(host, port, deadline, mix, seed, plan, plan_ids, results) for seed in range(clients)
+    ))
+    return results, time.perf_counter() - start
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def report(results, elapsed):
+    total = sum(len(samples) for samples in results.values())
+    print(f"{total} requests in {elapsed:.1f}s: {total / elapsed:.0f} req/s")
+    print(f"  {'endpoint':<14}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses")
+    for name, samples in sorted(results.items()):
+        latencies = sorted(latency for latency, _ in samples)
+        statuses = Counter(status for _, status in samples)
+        print(
+            f"  {name:<14}{len(samples):>7}"
+            f"{statistics.median(latencies) * 1000:>9.1f}"
+            f"{percentile(latencies, 0.95) * 1000:>9.1f}"
+            f"{percentile(latencies, 0.99) * 1000:>9.1f}  "
+            + ", ".join(f"{status}×{n}" for status, n in sorted(statuses.items()))
+        )
+
+
+def start_server(port, tmp):
+    # A scratch copy keeps --writes away from the real meals.db.
+    import db
+
+    path = os.path.join(tmp, "meals.db")
+    shutil.copyfile(db.DB_PATH, path)
+    code = f"import db, api; db.DB_PATH = {path!r}; api.main(['--port', '{port}'])"
+    server = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise SystemExit("API server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=32, help="concurrent connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--writes", action="store_true", help="include saves in the mix")
+    parser.add_argument("--start", action="store_true", help="start a server on a scratch copy of meals.db")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(args.port, tmp) if args.start else None
+        try:
+            results, elapsed = asyncio.run(run(args.host, args.port, args.clients, args.duration, args.writes))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+    report(results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Full-pipeline benchmark suite over synthetic catalogs.
+
+Run from the repository root:
+
+    python -m benchmarks.suite                          # default sizes, compare to baseline
+    python -m benchmarks.suite --sizes 1000 1000000     # pick catalog sizes
+    python -m benchmarks.suite --update-baseline        # accept current numbers
+    python -m benchmarks.suite --search-sizes           # skip the 1M-meal search catalog
+
+Every stage is timed on its own against a synthetic SQLite catalog of each
+size. Results are written as JSON (--output) and compared with the stored
+baseline; any stage slower than baseline * (1 + --tolerance), plus a small
+absolute slack for sub-millisecond stages, fails the run with exit status 1.
+Search is also timed on its own against larger catalogs (--search-sizes).
+Baselines are machine-specific: refresh them when the hardware changes.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import db
+from benchmarks.synthetic import write_catalog_db
+from meal_logic import (
+    CATEGORIES, MealHistory, build_catalog, build_ingredient_to_meals, build_meal_data,
+    build_multi_week_plan_from_catalog, build_weekly_plan, build_weekly_plan_from_catalog,
+    deserialize_weekly_plan, group_by_category, parse_ingredients, select_optimized_meals,
+    serialize_weekly_plan,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_SEARCH_SIZES = [1_000_000]
+# Synthetic names are "Meal <n>" and ingredients "ingredient <n>": a rare
+# prefix, a prefix every meal matches, and two words that each match broadly.
+SEARCH_QUERIES = {
+    "search_meals_narrow": "4321",
+    "search_meals_broad": "in",
+    "search_meals_two_words": "ingredient 17",
+}
+ABSOLUTE_SLACK_MS = 1.0
+
+
+def time_stage(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def open_catalog(size, tmp):
+    path = os.path.join(tmp, f"catalog_{size}.db")
+    if not os.path.exists(path):
+        write_catalog_db(path, size)
+    db.close_pools()
+    db.DB_PATH = path
+
+
+def search_stages(repeat=20):
+    return {
+        stage: time_stage(lambda: db.search_meals(query), repeat)
+        for stage, query in SEARCH_QUERIES.items()
+    }
+
+
+def bench_search(size, tmp):
+    open_catalog(size, tmp)
+    results = search_stages()
+    db.close_pools()
+    return results
+
+
+def bench_size(size, tmp, include_pdf):
+    open_catalog(size, tmp)
+    # Large catalogs get fewer repeats; per-plan stages are cheap at any size.
+    repeat = 5 if size <= 10_000 else 3 if size <= 100_000 else 1
+
+    rows = db.fetch_meals()
+    with db.read_connection() as conn:
+        texts = [t for (t,) in conn.execute("SELECT ingredients FROM meals")]
+    categorized = group_by_category(build_meal_data(rows))
+    catalog = build_catalog(rows)
+    rng = random.Random(0)
+    plan = build_weekly_plan_from_catalog(catalog, rng)
+    plan_json = json.dumps(serialize_weekly_plan(plan))
+    # One category without the most common ingredient: roughly an eighth of the catalog.
+    filters = db.meal_filters(exclude_ingredients=["ingredient 0"], categories=["dinner"])
+
+    results = {
+        "fetch_meals": time_stage(db.fetch_meals, repeat),
+        "fetch_meals_filtered": time_stage(lambda: db.fetch_meals(filters), repeat),
+        "parse_ingredients": time_stage(lambda: [parse_ingredients(t) for t in texts], repeat),
+        "select_optimized_meals": time_stage(
+            lambda: [select_optimized_meals(categorized.get(c, []), rng=rng) for c in CATEGORIES], repeat
+        ),
+        "build_weekly_plan": time_stage(lambda: build_weekly_plan(rows), repeat),
+        "build_weekly_plan_cached": time_stage(lambda: build_weekly_plan_from_catalog(catalog, rng), 50),
+        "build_month_plan_cached": time_stage(
+            lambda: build_multi_week_plan_from_catalog(catalog, 4, MealHistory(db.HISTORY_WINDOW), rng), 50
+        ),
+        "serialize_weekly_plan": time_stage(lambda: json.dumps(serialize_weekly_plan(plan)), 50),
+        "deserialize_weekly_plan": time_stage(lambda: deserialize_weekly_plan(plan_json), 50),
+        "build_ingredient_to_meals": time_stage(lambda: build_ingredient_to_meals(plan), 50),
+        **search_stages(),
+    }
+    if include_pdf:
+        from pdf_generator import render_pdf
+
+        render_pdf(plan)  # warm up fonts and styles
+        results["generate_pdf"] = time_stage(lambda: render_pdf(plan), 5)
+
+    db.close_pools()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for size, stages in results["sizes"].items():
+        for stage, ms in stages.items():
+            base = baseline.get("sizes", {}).get(size, {}).get(stage)
+            if base is not None and ms > base * (1 + tolerance) + ABSOLUTE_SLACK_MS:
+                regressions.append(f"{stage} @ {size} meals: {ms:.2f} ms vs baseline {base:.2f} ms")
+    return regressions
+
+
+def print_table(results, baseline):
+    for size, stages in results["sizes"].items():
+        print(f"\n{size} meals")
+        print(f"  {'stage':<28}{'ms':>10}{'baseline':>10}")
+        for stage, ms in stages.items():
+            base = baseline.get("sizes", {}).get(size, {}).get(stage)
+            base_text = f"{base:.2f}" if base is not None else "-"
+            print(f"  {stage:<28}{ms:>10.2f}{base_text:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--search-sizes", type=int, nargs="*", default=DEFAULT_SEARCH_SIZES,
+        help="catalog sizes timed for search only",
+    )
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown, 0.5 = 50%%")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--no-pdf", action="store_true", help="skip the ReportLab stage")
+    args = parser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        original_path = db.DB_PATH
+        try:
+            for size in args.sizes:
+                results["sizes"][str(size)] = bench_size(size, tmp, not args.no_pdf)
+            for size in args.search_sizes:
+                results["sizes"].setdefault(str(size), {}).update(bench_search(size, tmp))
+        finally:
+            db.DB_PATH = original_path
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    if args.update_baseline:
+        # Merge so refreshing one size keeps the others.
+        for size, stages in results["sizes"].items():
+            baseline.setdefault("sizes", {})[size] = stages
+        baseline.update(python=results["python"], machine=results["machine"])
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline updated: {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline}" if baseline else "\nNo baseline to compare against.")
+
+
+if __name__ == "__main__":
+    main()
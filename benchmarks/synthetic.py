@@ -0,0 +1,68 @@
+"""Synthetic meal catalogs for the benchmarks.
+
+Ingredient popularity follows a Zipf-like curve (a few staples such as salt
+or onion appear everywhere, most ingredients are rare), and meal sizes range
+from 2 to 10 ingredients, roughly like real recipe data.
+"""
+import os
+import random
+import sqlite3
+from itertools import accumulate
+
+from meal_logic import CATEGORIES, build_meal_data
+
+
+def vocabulary(size):
+    return [f"ingredient {i}" for i in range(size)]
+
+
+def vocab_size(meals):
+    # Larger catalogs use a larger, but sub-linear, ingredient vocabulary.
+    return max(50, min(20_000, int(meals ** 0.75)))
+
+
+def synthetic_rows(n, vocab=None, seed=0):
+    """Rows shaped like db.fetch_meals output."""
+    rng = random.Random(seed)
+    names = vocabulary(vocab or vocab_size(n))
+    # Cumulative once: choices() with plain weights re-sums the whole vocabulary per call.
+    cum_weights = list(accumulate(1 / (i + 1) for i in range(len(names))))
+    return [(
+        m + 1,
+        f"Meal {m + 1}",
+        CATEGORIES[m % len(CATEGORIES)],
+        tuple(set(rng.choices(names, cum_weights=cum_weights, k=rng.randint(2, 10)))),
+        None,
+    ) for m in range(n)]
+
+
+def synthetic_meals(n, vocab, seed=0):
+    return build_meal_data(synthetic_rows(n, vocab, seed))
+
+
+def write_catalog_db(path, n, seed=0, chunk=50_000):
+    """Create a meals.db-shaped database with n synthetic meals at path."""
+    from db import SCHEMA_PATH
+
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH) as f:
+        conn.executescript(f.read())
+    vocab = vocabulary(vocab_size(n))
+    with conn:
+        conn.executemany("INSERT INTO ingredients (id, name) VALUES (?, ?)", enumerate(vocab, 1))
+    ingredient_ids = {name: i for i, name in enumerate(vocab, 1)}
+    rows = synthetic_rows(n, len(vocab), seed)
+    for start in range(0, n, chunk):
+        batch = rows[start:start + chunk]
+        with conn:
+            conn.executemany(
+                "INSERT INTO meals (id, item_name, category, ingredients, notes) VALUES (?, ?, ?, ?, ?)",
+                ((i, name, category.title(), ", ".join(sorted(ing)), notes) for i, name, category, ing, notes in batch),
+            )
+            conn.executemany(
+                "INSERT INTO meal_ingredients (meal_id, ingredient_id) VALUES (?, ?)",
+                ((i, ingredient_ids[x]) for i, _, _, ing, _ in batch for x in ing),
+            )
+    conn.close()
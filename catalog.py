@@ -0,0 +1,189 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from db import fetch_catalog_version, fetch_meals, relink_edited_meals
+from instrumentation import count
+from meal_logic import build_catalog, build_weekly_plan_from_catalog, copy_plan
+from pantry import normalize_pantry
+
+# Filtered catalogs kept alongside the unfiltered one, least recently used evicted.
+FILTERED_CACHE_SIZE = 8
+PLAN_CACHE_SIZE = 256
+PLAN_CACHE_TTL = 600  # seconds
+
+
+# -----------------------------
+# Catalog Cache
+# -----------------------------
+class CatalogCache:
+    """Process-wide cache of the parsed, ranked catalog.
+
+    Every lookup reads the one-row catalog_version counter; the meals table
+    is only re-read when that counter has moved. Each filter set (a
+    db.MealFilters, None for the whole catalog) has its own entry, built from
+    just the meals that pass it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # filters -> Future of (version, catalog, by_id) for builds in progress.
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _current(self, filters=None):
+        # The lock only guards the dicts: builds run outside it, one per filter
+        # set, so a slow reload never blocks hits on other entries.
+        while True:
+            version = fetch_catalog_version()
+            with self._lock:
+                entry = self._entries.get(filters)
+                if entry is not None and entry[0] >= version:
+                    self._entries.move_to_end(filters)
+                    self.hits += 1
+                    count("catalog.hit")
+                    return entry[1], entry[2]
+                pending = self._pending.get(filters)
+                if pending is None:
+                    pending = self._pending[filters] = Future()
+                    self.misses += 1
+                    count("catalog.miss")
+                    break
+            built_version, catalog, by_id = pending.result()
+            # A build stamped before our version read could miss a write; retry.
+            if built_version >= version:
+                return catalog, by_id
+        try:
+            built = self._build(filters, version)
+            pending.set_result(built)
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._pending[filters]
+        return built[1], built[2]
+
+    def _build(self, filters, version):
+        # Edited ingredient text only reaches the links here; relinking
+        # moves the version again, so read it afresh.
+        if relink_edited_meals():
+            version = fetch_catalog_version()
+        # Stamped with the version read *before* fetching, so a concurrent
+        # write at worst causes one extra reload, never a stale hit.
+        catalog = build_catalog(fetch_meals(filters))
+        by_id = {meal["id"]: meal for meals in catalog.values() for meal in meals}
+        with self._lock:
+            entry = self._entries.get(filters)
+            if entry is None or entry[0] <= version:
+                self._entries[filters] = (version, catalog, by_id)
+            self._entries.move_to_end(filters)
+            # The unfiltered entry never counts against the limit.
+            while len(self._entries) > FILTERED_CACHE_SIZE + (None in self._entries):
+                oldest = next(key for key in self._entries if key is not None)
+                del self._entries[oldest]
+        return version, catalog, by_id
+
+    def get(self, filters=None):
+        return self._current(filters)[0]
+
+    def get_by_id(self, filters=None):
+        return self._current(filters)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            entry = self._entries.get(None)
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "version": entry[0] if entry else None,
+                "filtered_entries": sum(key is not None for key in self._entries),
+            }
+
+
+# -----------------------------
+# Plan Cache
+# -----------------------------
+class PlanCache:
+    """Bounded LRU of generated plans with a time-to-live.
+
+    Keys include the catalog version, so a catalog change never serves an
+    old plan; the TTL just bounds how long an unused entry holds memory.
+    """
+
+    def __init__(self, size=PLAN_CACHE_SIZE, ttl=PLAN_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._plans = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._plans.get(key)
+            if entry is not None and entry[0] > now:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                count("plan_cache.hit")
+                return entry[1]
+            self.misses += 1
+            count("plan_cache.miss")
+        plan = build()
+        with self._lock:
+            self._plans[key] = (now + self.ttl, plan)
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.size:
+                self._plans.popitem(last=False)
+        return plan
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._plans)}
+
+
+_cache = CatalogCache()
+_plans = PlanCache()
+
+
+def get_catalog(filters=None):
+    return _cache.get(filters)
+
+
+def get_meals_by_id(filters=None):
+    return _cache.get_by_id(filters)
+
+
+def get_plan(seed, filters=None, pantry=None):
+    """Return the deterministic plan for (catalog version, seed, filters, pantry).
+
+    Repeat requests (shared links, re-downloads) are a cache lookup. The
+    result is a fresh copy, so callers may swap meals in place.
+    """
+    pantry = normalize_pantry(pantry or ())
+    key = (fetch_catalog_version(), seed, filters, pantry)
+    plan = _plans.get(key, lambda: build_weekly_plan_from_catalog(
+        get_catalog(filters), random.Random(seed), pantry=pantry
+    ))
+    return copy_plan(plan)
+
+
+def new_seed():
+    return random.getrandbits(32)
+
+
+def catalog_stats():
+    return {**_cache.stats(), "plans": _plans.stats()}
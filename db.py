@@ -1,49 +1,725 @@
+import atexit
+import hashlib
+import os
+import queue
+import re
 import sqlite3
+import threading
 import json
+import unicodedata
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
 from datetime import datetime
+from urllib.parse import quote
+
+from instrumentation import count, span, traced
 
 DB_PATH = "meals.db"
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+POOL_SIZE = 4
+SAVED_PLANS_PAGE_SIZE = 20
+SEARCH_LIMIT = 20
+# Matches ranked per search; bounds the cost of broad prefixes such as "ch".
+SEARCH_CANDIDATES = 200
+HISTORY_WINDOW = 4
+# Most saves the background writer commits in one transaction.
+SAVE_BATCH_SIZE = 64
+
+# Applied to every pooled connection. Negative cache_size is in KiB.
+PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+)
+
+
+# Eligibility filters for fetch_meals; build them with meal_filters().
+# categories None means every category.
+MealFilters = namedtuple("MealFilters", ["exclude_ingredients", "categories", "tags"])
+
+# What a save resolves to. created is False when the same week was already
+# saved; id and name are then those of the existing entry.
+SavedPlan = namedtuple("SavedPlan", ["id", "name", "created"])
+
+
+# -----------------------------
+# Connection Pool
+# -----------------------------
+class ConnectionPool:
+    """One shared writer plus up to `size` read-only readers for a database file.
+
+    Connections stay open for the life of the process, so sqlite3's
+    per-connection statement cache and SQLite's page cache survive reruns.
+    """
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.pid = os.getpid()
+        self.size = size
+        self._write_lock = threading.Lock()
+        self._readers = queue.LifoQueue()
+        self._created = 0
+        self._created_lock = threading.Lock()
+        self._writer = self._connect(path)
+        self._writer.execute("PRAGMA journal_mode = WAL")
+        ensure_schema(self._writer)
+
+    def _connect(self, target, uri=False):
+        conn = sqlite3.connect(
+            target,
+            uri=uri,
+            timeout=5,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _open_reader(self):
+        # urllib.parse rather than urllib.request.pathname2url: the latter drags in http and ssl at import.
+        path = os.path.abspath(self.path).replace(os.sep, "/")
+        uri = f"file:{quote(path, safe='/:')}?mode=ro"
+        return self._connect(uri, uri=True)
+
+    def _acquire_reader(self):
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._created_lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._open_reader()
+        return self._readers.get()
+
+    @contextmanager
+    def reader(self):
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    @contextmanager
+    def writer(self):
+        with self._write_lock:
+            with self._writer:
+                yield self._writer
+
+    def close(self):
+        with self._write_lock:
+            self._writer.close()
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None):
+    path = path or DB_PATH
+    with _pools_lock:
+        pool = _pools.get(path)
+        # Connections must not cross a fork, so child processes get their own pool.
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[path] = ConnectionPool(path)
+        return pool
+
+
+def close_pools():
+    flush_saves()
+    with _pools_lock:
+        for pool in _pools.values():
+            if pool.pid == os.getpid():
+                pool.close()
+        _pools.clear()
+
+
+@contextmanager
+def read_connection():
+    with get_pool().reader() as conn:
+        yield conn
+
+
+@contextmanager
+def write_connection():
+    with get_pool().writer() as conn:
+        yield conn
+
+
+# -----------------------------
+# Schema & Migrations
+# -----------------------------
+def ensure_schema(conn):
+    """Bring the database up to date; runs once per pool, on the writer connection.
+
+    Each step in MIGRATIONS newer than PRAGMA user_version runs in one
+    transaction together with its user_version bump, so a step either lands
+    completely or runs again on the next open. Migration functions leave
+    transaction handling to their caller.
+
+    The ingredient relink and backfills run on every open instead: meals can
+    arrive or change outside the app (seed_data.sql, manual UPDATEs), and all
+    are cheap when nothing is missing.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, migration in enumerate(MIGRATIONS[version:], version + 1):
+        with span("db.migrate", version=target), conn:
+            conn.execute("BEGIN IMMEDIATE")
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+    with conn:
+        relink_meals(conn)
+        migrate_meal_ingredients(conn)
+        migrate_search_index(conn)
+
+
+def schema_statements():
+    # executescript() commits first, so schema.sql is split into statements
+    # that can run inside the migration's transaction.
+    statement = ""
+    with open(SCHEMA_PATH) as f:
+        for line in f:
+            statement += line
+            if sqlite3.complete_statement(statement):
+                yield statement
+                statement = ""
+
+
+def migrate_baseline(conn):
+    """Version 1: schema.sql, plus the backfills databases created before it needed."""
+    for statement in schema_statements():
+        conn.execute(statement)
+    migrate_meal_ingredients(conn)
+    migrate_saved_plans(conn)
+    migrate_plan_stats(conn)
+    migrate_saved_plan_slots(conn)
+
+
+def link_ingredients(conn, meal_id, ingredients):
+    """Attach already-normalized ingredient names to a meal, creating new ingredient rows."""
+    conn.executemany("INSERT OR IGNORE INTO ingredients (name) VALUES (?)", ((i,) for i in ingredients))
+    conn.executemany("""
+        INSERT OR IGNORE INTO meal_ingredients (meal_id, ingredient_id)
+        SELECT ?, id FROM ingredients WHERE name = ?
+    """, ((meal_id, i) for i in ingredients))
+
+
+def migrate_meal_ingredients(conn):
+    """Backfill the normalized ingredient tables for meals that only have the legacy text column.
+
+    Covers both an existing meals.db and rows loaded later from seed_data.sql.
+    """
+    from meal_logic import parse_ingredients
+
+    rows = conn.execute("""
+        SELECT id, ingredients FROM meals
+        WHERE id NOT IN (SELECT meal_id FROM meal_ingredients)
+    """).fetchall()
+    for meal_id, text in rows:
+        link_ingredients(conn, meal_id, parse_ingredients(text))
+    return len(rows)
+
+
+def relink_meals(conn):
+    """Rebuild the links of meals whose ingredients text was edited (queued in meals_relink)."""
+    from meal_logic import parse_ingredients
+
+    rows = conn.execute("""
+        SELECT r.meal_id, m.ingredients FROM meals_relink r
+        JOIN meals m ON m.id = r.meal_id
+    """).fetchall()
+    for meal_id, text in rows:
+        link_ingredients(conn, meal_id, parse_ingredients(text))
+    conn.execute("DELETE FROM meals_relink")
+    return len(rows)
+
+
+def relink_edited_meals():
+    """Apply pending ingredient edits; returns how many meals were relinked."""
+    with read_connection() as conn:
+        if conn.execute("SELECT 1 FROM meals_relink LIMIT 1").fetchone() is None:
+            return 0
+    with write_connection() as conn:
+        return relink_meals(conn)
+
+
+def migrate_saved_plans(conn):
+    """Move saved plans to the compact meal-id format.
+
+    Older databases get the plan_meals column (and a nullable plan_json) via a
+    table rebuild. Legacy rows are then packed when every stored meal still
+    matches a catalog meal exactly; the rest keep their JSON and load through
+    the legacy path.
+    """
+    from meal_logic import deserialize_weekly_plan, pack_weekly_plan
+
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(saved_plans)")]
+    if "plan_meals" not in columns:
+        conn.execute("""
+            CREATE TABLE saved_plans_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                plan_json TEXT,
+                plan_meals BLOB
+            )
+        """)
+        conn.execute("""
+            INSERT INTO saved_plans_new (id, name, created_at, plan_json)
+            SELECT id, name, created_at, plan_json FROM saved_plans
+        """)
+        conn.execute("DROP TABLE saved_plans")
+        conn.execute("ALTER TABLE saved_plans_new RENAME TO saved_plans")
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_saved_plans_created_at
+                ON saved_plans (created_at DESC, id DESC)
+        """)
+
+    legacy = conn.execute("SELECT id, plan_json FROM saved_plans WHERE plan_meals IS NULL").fetchall()
+    if not legacy:
+        return 0
+    # Item names are not unique, so only an exact match of the stored copy counts.
+    meal_ids = {
+        (name, category, ingredients, notes): meal_id
+        for meal_id, name, category, ingredients, notes in fetch_meals_from(conn)
+    }
+    converted = 0
+    for plan_id, plan_json in legacy:
+        plan = deserialize_weekly_plan(plan_json)
+        for meals in plan.values():
+            for category, meal in meals.items():
+                key = (meal["item_name"], meal["category"], frozenset(meal["ingredients"]), meal["notes"])
+                meals[category] = meal.replace(id=meal_ids.get(key))
+        packed = pack_weekly_plan(plan)
+        if packed is not None:
+            conn.execute(
+                "UPDATE saved_plans SET plan_meals = ?, plan_json = NULL WHERE id = ?",
+                (packed, plan_id),
+            )
+            converted += 1
+    return converted
+
+
+def insert_plan_slots(conn, plan_id, plan_meals):
+    from meal_logic import PLAN_SLOTS
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO saved_plan_slots (plan_id, slot, meal_id) VALUES (?, ?, ?)",
+        ((plan_id, slot, meal_id) for slot, meal_id in enumerate(PLAN_SLOTS.unpack(plan_meals)) if meal_id),
+    )
+
+
+def migrate_saved_plan_slots(conn):
+    """Index the slots of packed plans saved before saved_plan_slots existed."""
+    rows = conn.execute("""
+        SELECT id, plan_meals FROM saved_plans
+        WHERE plan_meals IS NOT NULL AND id NOT IN (SELECT plan_id FROM saved_plan_slots)
+    """).fetchall()
+    for plan_id, plan_meals in rows:
+        insert_plan_slots(conn, plan_id, plan_meals)
+    return len(rows)
+
+
+def rebuild_plan_stats(conn):
+    """Recompute meal_plan_stats from saved_plan_slots; the triggers keep it current afterwards."""
+    conn.execute("DELETE FROM meal_plan_stats")
+    conn.execute("""
+        INSERT INTO meal_plan_stats (meal_id, slots, plans)
+        SELECT meal_id, COUNT(*), COUNT(DISTINCT plan_id) FROM saved_plan_slots GROUP BY meal_id
+    """)
+
+
+def migrate_plan_stats(conn):
+    """Fill meal_plan_stats for slots written before it existed.
+
+    Runs before migrate_saved_plan_slots, whose inserts already go through
+    the triggers, so an empty table here means it was just created.
+    """
+    has_stats = conn.execute("SELECT 1 FROM meal_plan_stats LIMIT 1").fetchone()
+    has_slots = conn.execute("SELECT 1 FROM saved_plan_slots LIMIT 1").fetchone()
+    if has_slots and not has_stats:
+        rebuild_plan_stats(conn)
+
+
+def migrate_search_index(conn):
+    """Build meals_fts from scratch when it is missing rows, e.g. right after it was first created."""
+    indexed = conn.execute("SELECT COUNT(*) FROM meals_fts_docsize").fetchone()[0]
+    meals = conn.execute("SELECT COUNT(*) FROM meals").fetchone()[0]
+    if indexed != meals:
+        conn.execute("INSERT INTO meals_fts (meals_fts) VALUES ('rebuild')")
+
+
+def migrate_plan_hashes(conn):
+    """Version 2: content hashes so an identical week is only stored once.
+
+    Existing duplicates are kept; only the oldest copy of each week gets the
+    hash, the rest stay NULL and out of the unique index.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(saved_plans)")]
+    if "plan_hash" not in columns:
+        conn.execute("ALTER TABLE saved_plans ADD COLUMN plan_hash BLOB")
+    seen = set()
+    updates = []
+    for plan_id, plan_json, plan_meals in conn.execute(
+        "SELECT id, plan_json, plan_meals FROM saved_plans WHERE plan_hash IS NULL ORDER BY id"
+    ):
+        digest = plan_hash(plan_json, plan_meals)
+        if digest not in seen:
+            seen.add(digest)
+            updates.append((digest, plan_id))
+    conn.executemany("UPDATE saved_plans SET plan_hash = ? WHERE id = ?", updates)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_saved_plans_hash ON saved_plans (plan_hash)")
+
+
+def migrate_relink_queue(conn):
+    """Version 3: the meals_relink queue and its trigger; schema.sql is idempotent, so rerun it."""
+    for statement in schema_statements():
+        conn.execute(statement)
+
+
+# Applied in order; PRAGMA user_version holds how many have run. Append new
+# steps here rather than editing schema.sql, which stays the version 1 baseline.
+MIGRATIONS = [
+    migrate_baseline,
+    migrate_plan_hashes,
+    migrate_relink_queue,
+]
+
 
 # -----------------------------
 # Meal Data
 # -----------------------------
-def fetch_meals():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT item_name, category, ingredients, notes FROM meals")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+def _names(values):
+    return frozenset(v.strip().lower() for v in values or () if v and v.strip())
+
+
+def meal_filters(exclude_ingredients=(), categories=None, tags=()):
+    """Normalize filter options into a hashable MealFilters, or None when nothing is filtered."""
+    filters = MealFilters(
+        _names(exclude_ingredients),
+        _names(categories) if categories is not None else None,
+        _names(tags),
+    )
+    if not filters.exclude_ingredients and filters.categories is None and not filters.tags:
+        return None
+    return filters
+
+
+def eligible_meals_sql(filters):
+    """Return (sql, params) selecting the ids of meals that pass filters.
+
+    Every condition is answered from an index: the category expression index,
+    and the (ingredient_id, meal_id) / (tag_id, meal_id) indexes of the link
+    tables, so rejected meals are never read.
+    """
+    where, params = [], []
+    if filters.categories is not None:
+        where.append(f"lower(trim(category)) IN ({', '.join('?' * len(filters.categories))})")
+        params.extend(sorted(filters.categories))
+    if filters.exclude_ingredients:
+        where.append(f"""id NOT IN (
+            SELECT mi.meal_id FROM meal_ingredients mi
+            JOIN ingredients i ON i.id = mi.ingredient_id
+            WHERE i.name IN ({', '.join('?' * len(filters.exclude_ingredients))})
+        )""")
+        params.extend(sorted(filters.exclude_ingredients))
+    if filters.tags:
+        where.append(f"""id IN (
+            SELECT mt.meal_id FROM meal_tags mt
+            JOIN tags t ON t.id = mt.tag_id
+            WHERE t.name IN ({', '.join('?' * len(filters.tags))})
+            GROUP BY mt.meal_id HAVING COUNT(*) = ?
+        )""")
+        params.extend(sorted(filters.tags))
+        params.append(len(filters.tags))
+    return f"SELECT id FROM meals WHERE {' AND '.join(where) or '1'}", params
+
+
+def fetch_meals_from(conn, filters=None):
+    names = dict(conn.execute("SELECT id, name FROM ingredients"))
+    links = defaultdict(list)
+    if filters is None:
+        link_rows = conn.execute("SELECT meal_id, ingredient_id FROM meal_ingredients")
+        rows = conn.execute("SELECT id, item_name, lower(trim(category)), notes FROM meals").fetchall()
+    else:
+        eligible, params = eligible_meals_sql(filters)
+        link_rows = conn.execute(f"""
+            SELECT meal_id, ingredient_id FROM meal_ingredients
+            WHERE meal_id IN ({eligible})
+        """, params)
+        rows = conn.execute(f"""
+            WITH eligible (id) AS ({eligible})
+            SELECT m.id, m.item_name, lower(trim(m.category)), m.notes FROM eligible e
+            JOIN meals m ON m.id = e.id
+            ORDER BY m.id
+        """, params).fetchall()
+    for meal_id, ingredient_id in link_rows:
+        links[meal_id].append(names[ingredient_id])
+    return [
+        (meal_id, item_name, category, tuple(links.get(meal_id, ())), notes)
+        for meal_id, item_name, category, notes in rows
+    ]
+
+
+def fetch_meals(filters=None):
+    """Return (id, item_name, category, ingredients, notes) rows.
+
+    Categories come back normalized and ingredients as a tuple resolved from
+    the join table (one entry per link, so no duplicates), so callers never
+    have to parse the legacy text column.
+    Each ingredient name is a single shared string object across all meals.
+    With filters (see meal_filters) only eligible meals are read.
+    """
+    with span("db.fetch_meals", filtered=filters is not None) as s, read_connection() as conn:
+        rows = fetch_meals_from(conn, filters)
+        s["rows"] = len(rows)
+        return rows
+
+
+def fetch_ingredient_names():
+    with read_connection() as conn:
+        return [name for (name,) in conn.execute("SELECT name FROM ingredients ORDER BY name")]
+
+
+def fetch_tag_names():
+    with read_connection() as conn:
+        return [name for (name,) in conn.execute("SELECT name FROM tags ORDER BY name")]
+
+
+@traced("db.fetch_catalog_version")
+def fetch_catalog_version():
+    with read_connection() as conn:
+        return conn.execute("SELECT version FROM catalog_version").fetchone()[0]
+
+
+def _search_words(text):
+    # The FTS tokenizer's view of text: lowercased words with diacritics removed.
+    folded = unicodedata.normalize("NFKD", (text or "").lower())
+    return re.findall(r"\w+", "".join(c for c in folded if not unicodedata.combining(c)))
+
+
+def search_rank(row, terms):
+    """Sort key for a search hit (id, item_name, category, ingredients, notes).
+
+    Each term scores by the best field with a word starting with it: name 10,
+    ingredients 3, notes 1. Shorter names (closer matches) break ties.
+    """
+    fields = [(10, _search_words(row[1])), (3, _search_words(row[3])), (1, _search_words(row[4]))]
+    score = sum(
+        max((weight for weight, words in fields if any(word.startswith(term) for word in words)), default=0)
+        for term in terms
+    )
+    return -score, len(row[1]), row[0]
+
+
+def search_meals(query, limit=SEARCH_LIMIT):
+    """Ranked prefix search over meal names, ingredients and notes.
+
+    Every word in query must match the start of a word in the meal (so "chick
+    pas" finds "Chicken Pasta"). Name matches outrank ingredient matches, which
+    outrank notes. Returns (id, item_name, category) rows, best first.
+
+    Only the first SEARCH_CANDIDATES matches (in id order) are ranked, so a
+    broad prefix costs no more than a narrow one; with more matches than
+    that, later meals can be missed.
+    """
+    terms = _search_words(query)
+    if not terms:
+        return []
+    match = " ".join(f'"{term}"*' for term in terms)
+    with span("db.search_meals") as s, read_connection() as conn:
+        rows = conn.execute("""
+            SELECT m.id, m.item_name, lower(trim(m.category)), m.ingredients, m.notes
+            FROM (SELECT rowid FROM meals_fts WHERE meals_fts MATCH ? LIMIT ?) hits
+            JOIN meals m ON m.id = hits.rowid
+        """, (match, SEARCH_CANDIDATES)).fetchall()
+        s["candidates"] = len(rows)
+    rows.sort(key=lambda row: search_rank(row, terms))
+    return [row[:3] for row in rows[:limit]]
 
 
 # -----------------------------
 # Saved Plans
 # -----------------------------
-def save_weekly_plan(name, weekly_plan):
-    from meal_logic import serialize_weekly_plan
-
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS saved_plans (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            created_at TEXT,
-            plan_json TEXT
-        )
-    """)
-    cursor.execute("""
-        INSERT INTO saved_plans (name, created_at, plan_json)
-        VALUES (?, ?, ?)
-    """, (name, datetime.now().isoformat(), json.dumps(serialize_weekly_plan(weekly_plan))))
-    conn.commit()
-    conn.close()
-
-
-def fetch_saved_plans():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name, created_at, plan_json FROM saved_plans ORDER BY created_at DESC")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+def plan_hash(plan_json, plan_meals):
+    # The format is part of the hashed bytes, so a packed and a JSON plan never collide.
+    data = b"m" + plan_meals if plan_meals is not None else b"j" + plan_json.encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def insert_saved_plan(conn, name, created_at, plan_json, plan_meals):
+    """Insert one saved plan and its slots, returning a SavedPlan; a week already saved is not stored again."""
+    digest = plan_hash(plan_json, plan_meals)
+    row = conn.execute("SELECT id, name FROM saved_plans WHERE plan_hash = ?", (digest,)).fetchone()
+    if row is not None:
+        count("save.deduplicated")
+        return SavedPlan(row[0], row[1], False)
+    cursor = conn.execute("""
+        INSERT INTO saved_plans (name, created_at, plan_json, plan_meals, plan_hash)
+        VALUES (?, ?, ?, ?, ?)
+    """, (name, created_at, plan_json, plan_meals, digest))
+    if plan_meals is not None:
+        insert_plan_slots(conn, cursor.lastrowid, plan_meals)
+    return SavedPlan(cursor.lastrowid, name, True)
+
+
+class SaveQueue:
+    """Write-behind queue for saved plans.
+
+    submit() encodes the plan on the caller's thread and returns a Future
+    that resolves to a SavedPlan once its transaction has committed. A
+    background thread drains the queue, writing whatever has piled up (at
+    most `batch_size` saves) in one transaction; if that fails, the saves are
+    retried one by one so a bad plan only fails its own Future.
+    """
+
+    def __init__(self, batch_size=SAVE_BATCH_SIZE):
+        self.pid = os.getpid()
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="plan-saver", daemon=True)
+        self._thread.start()
+
+    def submit(self, name, weekly_plan):
+        from concurrent.futures import Future
+        from meal_logic import pack_weekly_plan, serialize_weekly_plan
+
+        plan_meals = pack_weekly_plan(weekly_plan)
+        # Plans holding meals without a catalog id (e.g. reloaded legacy rows) keep a JSON copy.
+        plan_json = None if plan_meals is not None else json.dumps(serialize_weekly_plan(weekly_plan))
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self._queue.put((future, (name, datetime.now().isoformat(), plan_json, plan_meals)))
+        return future
+
+    def flush(self, timeout=None):
+        """Wait until every save submitted before the call is written; False if timeout ran out first."""
+        from concurrent.futures import Future
+
+        marker = Future()
+        self._queue.put((marker, None))
+        try:
+            marker.result(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            saves = [item for item in batch if item[1] is not None]
+            if saves:
+                self._write(saves)
+            # Flush markers resolve only after the saves queued ahead of them.
+            for future, row in batch:
+                if row is None:
+                    future.set_result(None)
+
+    def _write(self, saves):
+        try:
+            with span("db.save_batch", saves=len(saves)), write_connection() as conn:
+                saved = [insert_saved_plan(conn, *row) for _, row in saves]
+        except Exception as e:
+            if len(saves) == 1:
+                saves[0][0].set_exception(e)
+            else:
+                for save in saves:
+                    self._write([save])
+            return
+        for (future, _), result in zip(saves, saved):
+            future.set_result(result)
+
+
+_save_queue = None
+_save_queue_lock = threading.Lock()
+
+
+def get_save_queue():
+    global _save_queue
+    with _save_queue_lock:
+        # Threads do not survive a fork, so child processes get their own queue.
+        if _save_queue is None or _save_queue.pid != os.getpid():
+            _save_queue = SaveQueue()
+        return _save_queue
+
+
+def queue_weekly_plan(name, weekly_plan):
+    """Hand a plan to the background writer; returns a Future of its SavedPlan."""
+    return get_save_queue().submit(name, weekly_plan)
+
+
+@traced("db.save_weekly_plan")
+def save_weekly_plan(name, weekly_plan, timeout=None):
+    """Save a plan through the write-behind queue and wait for the commit; returns a SavedPlan."""
+    return queue_weekly_plan(name, weekly_plan).result(timeout)
+
+
+def flush_saves(timeout=None):
+    """Wait for queued saves to be written; True when nothing is left pending."""
+    with _save_queue_lock:
+        save_queue = _save_queue
+    if save_queue is None or save_queue.pid != os.getpid():
+        return True
+    return save_queue.flush(timeout)
+
+
+# Queued saves are written before the interpreter exits (daemon threads are still running here).
+atexit.register(flush_saves)
+
+
+def fetch_saved_plan_page(limit=SAVED_PLANS_PAGE_SIZE, before=None):
+    """Return up to `limit` (id, name, created_at) rows, newest first, without plan bodies.
+
+    `before` is the (created_at, id) of the last row on the previous page.
+    Keyset pagination keeps every page a short range scan of the created_at index.
+    """
+    with span("db.fetch_saved_plan_page") as s, read_connection() as conn:
+        if before is None:
+            rows = conn.execute("""
+                SELECT id, name, created_at FROM saved_plans
+                ORDER BY created_at DESC, id DESC LIMIT ?
+            """, (limit,)).fetchall()
+        else:
+            rows = conn.execute("""
+                SELECT id, name, created_at FROM saved_plans
+                WHERE (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC LIMIT ?
+            """, (*before, limit)).fetchall()
+        s["rows"] = len(rows)
+        return rows
+
+
+def fetch_recent_meal_ids(window=HISTORY_WINDOW):
+    """Meal ids of the `window` most recently saved plans, as one frozenset per plan, newest first."""
+    with span("db.fetch_recent_meal_ids") as s, read_connection() as conn:
+        rows = conn.execute("""
+            SELECT p.id, s.meal_id
+            FROM (SELECT id, created_at FROM saved_plans ORDER BY created_at DESC, id DESC LIMIT ?) p
+            JOIN saved_plan_slots s ON s.plan_id = p.id
+            ORDER BY p.created_at DESC, p.id DESC
+        """, (window,)).fetchall()
+        s["rows"] = len(rows)
+    plans = {}
+    for plan_id, meal_id in rows:
+        plans.setdefault(plan_id, set()).add(meal_id)
+    return [frozenset(ids) for ids in plans.values()]
+
+
+@traced("db.fetch_saved_plan")
+def fetch_saved_plan(plan_id):
+    """Return (plan_json, plan_meals) for one saved plan; decode with meal_logic.decode_saved_plan."""
+    with read_connection() as conn:
+        return conn.execute("SELECT plan_json, plan_meals FROM saved_plans WHERE id = ?", (plan_id,)).fetchone()
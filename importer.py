@@ -0,0 +1,191 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from itertools import islice
+
+from db import write_connection
+from instrumentation import span
+from meal_logic import parse_ingredients
+
+BATCH_SIZE = 5000
+
+
+# -----------------------------
+# Readers (streaming)
+# -----------------------------
+def read_csv(path):
+    # Expects item_name, category, ingredients and (optionally) notes and tags columns.
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"line {number}: {e}") from e
+
+
+READERS = {".csv": read_csv, ".jsonl": read_jsonl, ".ndjson": read_jsonl}
+
+
+def read_records(path, fmt=None):
+    ext = f".{fmt}" if fmt else os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"Unsupported recipe feed format: {path}")
+    return READERS[ext](path)
+
+
+class FeedError(ValueError):
+    """A feed that stopped decoding part-way; stats covers the batches already committed."""
+
+    def __init__(self, message, stats):
+        super().__init__(message)
+        self.stats = stats
+
+
+# -----------------------------
+# Normalization
+# -----------------------------
+def _text(record, key):
+    # Missing or null is empty; any other non-string makes the record unusable.
+    value = record.get(key)
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else None
+
+
+def _names(record, key):
+    # A comma-separated string, or a JSONL list of strings joined into one.
+    value = record.get(key)
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return ",".join(value)
+    return _text(record, key)
+
+
+def normalize_record(record):
+    """Return (item_name, category, ingredients, notes, tags) or None for an unusable record.
+
+    Matches the app's own normalization: categories are stripped and lowercased,
+    ingredients and tags go through parse_ingredients (a list in JSONL is joined first).
+    Records that are not objects, or have fields of the wrong type, are unusable.
+    """
+    if not isinstance(record, dict):
+        return None
+    fields = _text(record, "item_name"), _text(record, "category"), _names(record, "ingredients")
+    notes, tags = _text(record, "notes"), _names(record, "tags")
+    if None in fields or notes is None or tags is None:
+        return None
+    name, category, ingredients = fields[0].strip(), fields[1].strip().lower(), parse_ingredients(fields[2])
+    if not name or not category or not ingredients:
+        return None
+    return name, category, ingredients, notes.strip() or None, parse_ingredients(tags)
+
+
+# -----------------------------
+# Import
+# -----------------------------
+def insert_batch(conn, batch):
+    """Insert one batch of normalized records, skipping names already in meals or earlier in the batch.
+
+    Returns the number of meals inserted. Relies on holding the writer, so
+    every id above the previous maximum belongs to this batch.
+    """
+    # Only the first record per name is inserted, so only its ingredients
+    # and tags may be linked to the new meal.
+    first = {}
+    for record in batch:
+        first.setdefault(record[0], record)
+    batch = list(first.values())
+
+    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM meals").fetchone()[0]
+    conn.executemany("""
+        INSERT INTO meals (item_name, category, ingredients, notes)
+        SELECT ?, ?, ?, ?
+        WHERE NOT EXISTS (SELECT 1 FROM meals WHERE item_name = ?)
+    """, ((name, category, ", ".join(sorted(ingredients)), notes, name)
+          for name, category, ingredients, notes, _ in batch))
+
+    new_ids = dict(conn.execute("SELECT item_name, id FROM meals WHERE id > ?", (last_id,)))
+    if not new_ids:
+        return 0
+    new = [record for record in batch if record[0] in new_ids]
+    names = {i for _, _, ingredients, _, _ in new for i in ingredients}
+    conn.executemany("INSERT OR IGNORE INTO ingredients (name) VALUES (?)", ((i,) for i in names))
+    conn.executemany("""
+        INSERT OR IGNORE INTO meal_ingredients (meal_id, ingredient_id)
+        SELECT ?, id FROM ingredients WHERE name = ?
+    """, ((new_ids[name], i) for name, _, ingredients, _, _ in new for i in ingredients))
+    tags = {t for _, _, _, _, meal_tags in new for t in meal_tags}
+    if tags:
+        conn.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", ((t,) for t in tags))
+        conn.executemany("""
+            INSERT OR IGNORE INTO meal_tags (meal_id, tag_id)
+            SELECT ?, id FROM tags WHERE name = ?
+        """, ((new_ids[name], t) for name, _, _, _, meal_tags in new for t in meal_tags))
+    return len(new_ids)
+
+
+def import_records(records, batch_size=BATCH_SIZE):
+    """Stream records into the catalog, one transaction per batch.
+
+    Only one batch is held in memory at a time, whatever the size of the feed.
+    A feed that fails to decode raises FeedError; earlier batches stay committed.
+    """
+    stats = {"read": 0, "inserted": 0, "duplicates": 0, "skipped": 0}
+    records = iter(records)
+    while True:
+        try:
+            chunk = list(islice(records, batch_size))
+        except (ValueError, csv.Error) as e:
+            raise FeedError(str(e), stats) from e
+        if not chunk:
+            return stats
+        stats["read"] += len(chunk)
+        batch = []
+        for record in chunk:
+            normalized = normalize_record(record)
+            if normalized is None:
+                stats["skipped"] += 1
+            else:
+                batch.append(normalized)
+        with span("importer.batch", rows=len(batch)), write_connection() as conn:
+            inserted = insert_batch(conn, batch)
+        stats["inserted"] += inserted
+        stats["duplicates"] += len(batch) - inserted
+
+
+def import_file(path, fmt=None, batch_size=BATCH_SIZE):
+    return import_records(read_records(path, fmt), batch_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream CSV/JSONL recipe feeds into meals.db.")
+    parser.add_argument("paths", nargs="+", help="recipe feed files (.csv, .jsonl)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="override format detection")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per transaction")
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        try:
+            stats = import_file(path, args.format, args.batch_size)
+        except FeedError as e:
+            print(f"❌ {path}: {e} ({e.stats['inserted']} imported before the error)", file=sys.stderr)
+            return 1
+        except (OSError, ValueError) as e:
+            print(f"❌ {path}: {e}", file=sys.stderr)
+            return 1
+        print(
+            f"✅ {path}: {stats['inserted']} imported, {stats['duplicates']} duplicates, "
+            f"{stats['skipped']} skipped ({stats['read']} read)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; meal_logic falls back to pure Python
+    np = None
+
+
+# -----------------------------
+# Meal x Ingredient Incidence
+# -----------------------------
+class IncidenceMatrix:
+    """Sparse CSR incidence matrix A for one list of meals (rows) and their ingredients (columns).
+
+    Overlap scores are A @ (A.T @ 1): every meal's summed ingredient frequency,
+    the same quantity meal_logic.score_meals computes with a Counter.
+    """
+
+    def __init__(self, meals):
+        rows = [meal.ingredients for meal in meals]
+        lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+        flat = list(chain.from_iterable(rows))
+        # Columns in first-seen order, numbered without a Python-level loop.
+        columns = {name: c for c, name in enumerate(dict.fromkeys(flat))}
+        self.indices = np.fromiter(map(columns.__getitem__, flat), dtype=np.int32, count=len(flat))
+        self.indptr = np.concatenate(([0], np.cumsum(lengths)))
+        self.rows = np.repeat(np.arange(len(meals), dtype=np.int32), lengths)
+        self.columns = columns
+        self.shape = (len(meals), len(columns))
+
+    def ingredient_counts(self):
+        return np.bincount(self.indices, minlength=self.shape[1])
+
+    def scores(self):
+        weights = self.ingredient_counts()[self.indices]
+        return np.bincount(self.rows, weights=weights, minlength=self.shape[0]).astype(np.int64)
+
+    def ranking(self):
+        # Stable descending sort, matching sorted(..., reverse=True) on ties.
+        return np.argsort(-self.scores(), kind="stable")
+
+
+def available():
+    return np is not None
+
+
+def rank_meals(meals):
+    if np is None:
+        raise RuntimeError("the numpy ranking engine requires numpy to be installed")
+    if not meals:
+        return []
+    return [meals[i] for i in IncidenceMatrix(meals).ranking()]
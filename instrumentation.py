@@ -0,0 +1,170 @@
+import atexit
+import functools
+import io
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# Opt-in hot-path instrumentation, off unless MEAL_PLANNER_TRACE is set.
+#   MEAL_PLANNER_TRACE=1          record span timings, row counts and cache hits
+#   MEAL_PLANNER_PROFILE=1        also capture cProfile stats around @profiled calls
+#   MEAL_PLANNER_TRACE_DUMP=path  write snapshot() as JSON to path at exit
+# When disabled, span() and the decorators cost one flag check per call, and
+# cProfile/pstats are never imported.
+
+
+def _flag(name):
+    return os.environ.get(name, "").strip().lower() not in ("", "0", "false", "no")
+
+
+MAX_SPANS = 5000
+MAX_PROFILES = 20
+PROFILE_LINES = 30
+
+_enabled = _flag("MEAL_PLANNER_TRACE")
+_profiling = _enabled and _flag("MEAL_PLANNER_PROFILE")
+_lock = threading.Lock()
+_spans = deque(maxlen=MAX_SPANS)
+_profiles = deque(maxlen=MAX_PROFILES)
+_counters = Counter()
+_local = threading.local()
+# Only one cProfile capture can be active at a time (and nested ones are skipped).
+_profile_lock = threading.Lock()
+
+
+def enabled():
+    return _enabled
+
+
+# -----------------------------
+# Recording
+# -----------------------------
+@contextmanager
+def span(name, **attrs):
+    """Time a block. Callers may add attributes (e.g. rows) to the yielded dict."""
+    if not _enabled:
+        yield attrs
+        return
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    started = time.time()
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        _local.depth = depth
+        record = {
+            "name": name,
+            "start": started,
+            "ms": round(elapsed, 3),
+            "depth": depth,
+            "thread": threading.current_thread().name,
+        }
+        record.update(attrs)
+        with _lock:
+            _spans.append(record)
+
+
+def count(name, n=1):
+    if _enabled:
+        with _lock:
+            _counters[name] += n
+
+
+def traced(name):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def profiled(name):
+    """Capture a cProfile of the call when profiling is on; otherwise just trace it."""
+    def decorate(fn):
+        traced_fn = traced(name)(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _profiling or not _profile_lock.acquire(blocking=False):
+                return traced_fn(*args, **kwargs)
+            import cProfile
+
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                try:
+                    return traced_fn(*args, **kwargs)
+                finally:
+                    profile.disable()
+            finally:
+                _profile_lock.release()
+                _store_profile(name, profile)
+        return wrapper
+    return decorate
+
+
+def _store_profile(name, profile):
+    import pstats
+
+    out = io.StringIO()
+    stats = pstats.Stats(profile, stream=out)
+    stats.sort_stats("cumulative").print_stats(PROFILE_LINES)
+    with _lock:
+        _profiles.append({
+            "name": name,
+            "at": time.time(),
+            "total_ms": round(stats.total_tt * 1000, 3),
+            "stats": out.getvalue(),
+        })
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def summary():
+    totals = {}
+    with _lock:
+        spans = list(_spans)
+    for record in spans:
+        entry = totals.setdefault(record["name"], {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0})
+        entry["calls"] += 1
+        entry["total_ms"] += record["ms"]
+        entry["max_ms"] = max(entry["max_ms"], record["ms"])
+        entry["rows"] += record.get("rows", 0)
+    for entry in totals.values():
+        entry["mean_ms"] = round(entry["total_ms"] / entry["calls"], 3)
+        entry["total_ms"] = round(entry["total_ms"], 3)
+    return totals
+
+
+def snapshot():
+    with _lock:
+        spans = list(_spans)
+        counters = dict(_counters)
+        profiles = list(_profiles)
+    return {
+        "enabled": _enabled,
+        "profiling": _profiling,
+        "summary": summary(),
+        "counters": counters,
+        "spans": spans,
+        "profiles": profiles,
+    }
+
+
+def dump_json(path):
+    with open(path, "w") as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+if _enabled and os.environ.get("MEAL_PLANNER_TRACE_DUMP"):
+    atexit.register(dump_json, os.environ["MEAL_PLANNER_TRACE_DUMP"])
@@ -1,6 +1,24 @@
 import random
 import json
-from collections import Counter, defaultdict
+import struct
+import sys
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict, deque
+
+from instrumentation import profiled, span, traced
+
+CATEGORIES = ["breakfast", "lunch", "dinner", "snack"]
+
+# Compact saved-plan format: one little-endian int32 meal id per slot,
+# day-major in CATEGORIES order, 0 for an empty slot.
+PLAN_SLOTS = struct.Struct(f"<{7 * len(CATEGORIES)}i")
+
+# Below this many meals the NumPy engine's setup costs more than it saves.
+NUMPY_MIN_MEALS = 2000
+
+# How many of a category's top-ranked meals the planners sample from.
+SAMPLE_POOL = 15
+
 
 # -----------------------------
 # Ingredient Parsing
@@ -15,50 +33,330 @@ def parse_ingredients(text):
 def group_by_category(meals):
     grouped = {}
     for meal in meals:
-        grouped.setdefault(meal["category"], []).append(meal)
+        grouped.setdefault(meal.category, []).append(meal)
     return grouped
 
 
-def select_optimized_meals(meals, total=7):
-    if not meals:
-        return []
+def score_meals(meals):
     counter = Counter()
     for meal in meals:
-        counter.update(meal["ingredients"])
-    for meal in meals:
-        meal["score"] = sum(counter[i] for i in meal["ingredients"])
-    sorted_meals = sorted(meals, key=lambda x: x["score"], reverse=True)
-    if len(sorted_meals) <= total:
-        return sorted_meals
-    pool = sorted_meals[:max(15, total)]
-    return random.sample(pool, total)
-
-
-def build_weekly_plan(db_rows):
-    meal_data = [{
-        "item_name": r[0],
-        "category": r[1].strip().lower(),
-        "ingredients": parse_ingredients(r[2]),
-        "notes": r[3]
-    } for r in db_rows]
-
-    categorized = group_by_category(meal_data)
-    weekly_plan = {day: {} for day in range(7)}
+        counter.update(meal.ingredients)
+    return [sum(counter[i] for i in meal.ingredients) for meal in meals]
+
+
+@traced("meal_logic.rank_meals")
+def rank_meals(meals, engine="auto"):
+    # Highest ingredient overlap first; ties keep catalog order.
+    # engine: "python", "numpy", or "auto" (numpy for large inputs when installed).
+    if engine == "numpy" or (engine == "auto" and len(meals) >= NUMPY_MIN_MEALS):
+        import incidence
+        if engine == "numpy" or incidence.available():
+            return incidence.rank_meals(meals)
+    scores = score_meals(meals)
+    order = sorted(range(len(meals)), key=scores.__getitem__, reverse=True)
+    return [meals[i] for i in order]
+
+
+def sample_ranked(ranked, total=7, rng=random):
+    if len(ranked) <= total:
+        return list(ranked)
+    pool = ranked[:max(SAMPLE_POOL, total)]
+    return rng.sample(pool, total)
+
+
+def select_optimized_meals(meals, total=7, engine="auto", rng=random):
+    if not meals:
+        return []
+    return sample_ranked(rank_meals(meals, engine), total, rng)
+
+
+# -----------------------------
+# Meal Records
+# -----------------------------
+class Meal:
+    """One catalog meal: immutable and slotted, so plans and caches share one instance.
+
+    ingredients is a tuple (not a set) of shared names, so every meal using
+    "onion" points at the same string and a meal costs a few pointers rather
+    than a dict plus a hash set. meal["key"], meal.get() and keys() keep code
+    written against the old per-meal dicts working; hot loops read attributes.
+    """
+
+    __slots__ = ("id", "item_name", "category", "ingredients", "notes")
+
+    def __init__(self, id, item_name, category, ingredients, notes):
+        # A tuple is one a Meal already normalized (copies, unpickling).
+        if not isinstance(ingredients, tuple):
+            ingredients = tuple(map(sys.intern, ingredients))
+        _set_id(self, id)
+        _set_item_name(self, item_name)
+        _set_category(self, category)
+        _set_ingredients(self, ingredients)
+        _set_notes(self, notes)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Meal is immutable, cannot set {name!r}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Meal is immutable, cannot delete {name!r}")
+
+    def __reduce__(self):
+        # Pickled for the PDF and batch worker processes; __init__ rebuilds the slots.
+        return Meal, self._fields()
+
+    def _fields(self):
+        return (self.id, self.item_name, self.category, self.ingredients, self.notes)
+
+    def __eq__(self, other):
+        if not isinstance(other, Meal):
+            return NotImplemented
+        return self._fields() == other._fields()
 
-    for category in ["breakfast", "lunch", "dinner", "snack"]:
-        selected = select_optimized_meals(categorized.get(category, []), total=7)
+    def __hash__(self):
+        return hash(self._fields())
+
+    def __repr__(self):
+        return f"Meal(id={self.id!r}, item_name={self.item_name!r}, category={self.category!r})"
+
+    def __getitem__(self, key):
+        if key not in Meal.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in Meal.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in Meal.__slots__ else default
+
+    def keys(self):
+        return Meal.__slots__
+
+    def replace(self, **changes):
+        return Meal(*(changes.get(key, getattr(self, key)) for key in Meal.__slots__))
+
+
+# Slot setters: fill a Meal without going through the immutability guard.
+_set_id, _set_item_name, _set_category, _set_ingredients, _set_notes = (
+    Meal.__dict__[key].__set__ for key in Meal.__slots__
+)
+
+
+def build_meal_data(db_rows):
+    # Rows from db.fetch_meals are already normalized, with ingredients as a
+    # tuple of shared strings, so meals are filled in directly: no parsing, no
+    # interning, and tuple() hands the row's tuple back without copying.
+    new = object.__new__
+    meals = []
+    for meal_id, item_name, category, ingredients, notes in db_rows:
+        meal = new(Meal)
+        _set_id(meal, meal_id)
+        _set_item_name(meal, item_name)
+        _set_category(meal, category)
+        _set_ingredients(meal, tuple(ingredients))
+        _set_notes(meal, notes)
+        meals.append(meal)
+    return meals
+
+
+def build_catalog(db_rows):
+    """Parse rows once into per-category meal lists, each ranked by ingredient overlap."""
+    with span("meal_logic.build_catalog", rows=len(db_rows)):
+        categorized = group_by_category(build_meal_data(db_rows))
+        return {category: rank_meals(meals) for category, meals in categorized.items()}
+
+
+_pantry_indexes = (None, None)
+
+
+def pantry_indexes(catalog):
+    # Built once per catalog object; the catalog cache hands out the same one until it reloads.
+    global _pantry_indexes
+    cached_catalog, indexes = _pantry_indexes
+    if cached_catalog is not catalog:
+        import pantry
+        with span("meal_logic.pantry_indexes"):
+            indexes = pantry.build_pantry_indexes(catalog)
+        _pantry_indexes = (catalog, indexes)
+    return indexes
+
+
+@profiled("meal_logic.build_weekly_plan_from_catalog")
+def build_weekly_plan_from_catalog(catalog, rng=random, pantry=None):
+    """Sample a week from the ranked catalog.
+
+    With a pantry (ingredient names or a comma-separated string) the planner
+    switches to pantry mode and favours meals that need the fewest purchases.
+    """
+    if pantry:
+        from pantry import build_pantry_plan
+        return build_pantry_plan(pantry_indexes(catalog), pantry, rng)
+    weekly_plan = {day: {} for day in range(7)}
+    for category in CATEGORIES:
+        selected = sample_ranked(catalog.get(category, []), total=7, rng=rng)
         for day in range(7):
             if day < len(selected):
                 weekly_plan[day][category] = selected[day]
     return weekly_plan
 
 
-def build_grocery_list(plan):
+@profiled("meal_logic.build_weekly_plan")
+def build_weekly_plan(db_rows, pantry=None, seed=None):
+    """Build one week from db rows; the same rows, pantry and seed always give the same plan."""
+    rng = random.Random(seed) if seed is not None else random
+    return build_weekly_plan_from_catalog(build_catalog(db_rows), rng, pantry=pantry)
+
+
+# -----------------------------
+# Multi-Week Planning
+# -----------------------------
+class MealHistory:
+    """Rolling window of the meal ids served in the last `window` weeks.
+
+    push() adds a week and drops the oldest one past the window, adjusting
+    a per-meal count, so membership stays O(1) however long the plan runs.
+    """
+
+    def __init__(self, window, weeks=()):
+        self.window = window
+        self._weeks = deque()
+        self._counts = Counter()
+        for meal_ids in weeks:
+            self.push(meal_ids)
+
+    def push(self, meal_ids):
+        meal_ids = frozenset(meal_ids)
+        self._weeks.append(meal_ids)
+        self._counts.update(meal_ids)
+        while len(self._weeks) > self.window:
+            for meal_id in self._weeks.popleft():
+                self._counts[meal_id] -= 1
+                if not self._counts[meal_id]:
+                    del self._counts[meal_id]
+
+    def __contains__(self, meal_id):
+        return meal_id in self._counts
+
+    def __len__(self):
+        return len(self._counts)
+
+
+def copy_plan(weekly_plan):
+    # Slots are copied so in-place swaps never touch the original; meals stay shared.
+    return {day: dict(meals) for day, meals in weekly_plan.items()}
+
+
+def plan_meal_ids(weekly_plan):
+    return {meal["id"] for meals in weekly_plan.values() for meal in meals.values() if meal.get("id")}
+
+
+def sample_fresh(ranked, history, total=7, rng=random):
+    """sample_ranked over the meals not in history, topped up with recent ones if too few are fresh.
+
+    Walks the ranked list only until the sampling pool is full, so the cost
+    depends on the history size, not the catalog size.
+    """
+    size = max(SAMPLE_POOL, total)
+    pool, recent = [], []
+    for meal in ranked:
+        if meal["id"] in history:
+            if len(recent) < total:
+                recent.append(meal)
+        else:
+            pool.append(meal)
+            if len(pool) == size:
+                break
+    if len(pool) < total:
+        return pool + recent[:total - len(pool)]
+    return rng.sample(pool, total)
+
+
+@traced("meal_logic.build_multi_week_plan")
+def build_multi_week_plan_from_catalog(catalog, weeks, history=None, rng=random):
+    """Plan `weeks` consecutive weeks, keeping meals out of the history window of earlier ones.
+
+    history is a MealHistory, typically seeded from recently saved plans;
+    each generated week is pushed onto it, so it keeps rolling forward.
+    """
+    history = history if history is not None else MealHistory(1)
+    plans = []
+    for _ in range(weeks):
+        weekly_plan = {day: {} for day in range(7)}
+        for category in CATEGORIES:
+            selected = sample_fresh(catalog.get(category, []), history, total=7, rng=rng)
+            for day, meal in enumerate(selected):
+                weekly_plan[day][category] = meal
+        history.push(plan_meal_ids(weekly_plan))
+        plans.append(weekly_plan)
+    return plans
+
+
+# -----------------------------
+# Batch Generation
+# -----------------------------
+_worker_catalog = None
+
+
+def _init_plan_worker(catalog):
+    global _worker_catalog
+    _worker_catalog = catalog
+
+
+def _build_plan_ids(seeds):
+    # Runs in a worker: ship back meal ids only, the parent already holds the meals.
+    plans = []
+    for seed in seeds:
+        plan = build_weekly_plan_from_catalog(_worker_catalog, random.Random(seed))
+        plans.append({day: {c: m["id"] for c, m in meals.items()} for day, meals in plan.items()})
+    return plans
+
+
+@traced("meal_logic.build_weekly_plans")
+def build_weekly_plans_from_catalog(catalog, n, seeds=None, workers=None):
+    if seeds is None:
+        seeds = [random.getrandbits(64) for _ in range(n)]
+    elif len(seeds) != n:
+        raise ValueError(f"Expected {n} seeds, got {len(seeds)}")
+
+    if not workers or workers <= 1 or n < 2:
+        return [build_weekly_plan_from_catalog(catalog, random.Random(seed)) for seed in seeds]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    by_id = {meal["id"]: meal for meals in catalog.values() for meal in meals}
+    chunk = max(1, -(-n // (workers * 4)))
+    chunks = [seeds[i:i + chunk] for i in range(0, n, chunk)]
+    plans = []
+    # The catalog is pickled once per worker through the initializer, not once per task.
+    with ProcessPoolExecutor(workers, initializer=_init_plan_worker, initargs=(catalog,)) as executor:
+        for id_plans in executor.map(_build_plan_ids, chunks):
+            for id_plan in id_plans:
+                plans.append({day: {c: by_id[i] for c, i in meals.items()} for day, meals in id_plan.items()})
+    return plans
+
+
+def build_weekly_plans(db_rows, n, seeds=None, workers=None):
+    """Build n independent weekly plans from a single parse of db_rows.
+
+    Passing seeds (one per plan) makes the result reproducible, with or without
+    workers. With workers > 1 the plans are generated in a process pool.
+    """
+    return build_weekly_plans_from_catalog(build_catalog(db_rows), n, seeds, workers)
+
+
+# -----------------------------
+# Grocery List
+# -----------------------------
+def build_grocery_list(plan, pantry=()):
     ingredients = set()
     for day in plan.values():
         for meal in day.values():
             ingredients.update(meal["ingredients"])
-    return sorted(ingredients)
+    return sorted(ingredients.difference(pantry))
+
+
+def meal_label(category, meal):
+    return f"{category.capitalize()}: {meal['item_name']}"
 
 
 def build_ingredient_to_meals(plan):
@@ -66,10 +364,92 @@ def build_ingredient_to_meals(plan):
     for day_meals in plan.values():
         for category, meal in day_meals.items():
             for ingredient in meal["ingredients"]:
-                mapping[ingredient].append(f"{category.capitalize()}: {meal['item_name']}")
+                mapping[ingredient].append(meal_label(category, meal))
     return mapping
 
 
+class GroceryIndex:
+    """Reference-counted ingredient -> meal labels index kept in step with a plan.
+
+    add/remove only touch the ingredients of the meal involved, so swapping a
+    slot costs O(changed ingredients) rather than a rescan of all 28 slots.
+    """
+
+    def __init__(self, plan=None):
+        self._labels = {}
+        self._sorted = []
+        for day_meals in (plan or {}).values():
+            for category, meal in day_meals.items():
+                self.add(category, meal)
+
+    def add(self, category, meal):
+        label = meal_label(category, meal)
+        for ingredient in meal["ingredients"]:
+            labels = self._labels.get(ingredient)
+            if labels is None:
+                labels = self._labels[ingredient] = Counter()
+                insort(self._sorted, ingredient)
+            labels[label] += 1
+
+    def remove(self, category, meal):
+        label = meal_label(category, meal)
+        for ingredient in meal["ingredients"]:
+            labels = self._labels[ingredient]
+            labels[label] -= 1
+            if labels[label] <= 0:
+                del labels[label]
+            if not labels:
+                del self._labels[ingredient]
+                del self._sorted[bisect_left(self._sorted, ingredient)]
+
+    def grocery_list(self):
+        return list(self._sorted)
+
+    def meals_for(self, ingredient):
+        return list(self._labels[ingredient].elements())
+
+    def ingredient_to_meals(self):
+        return {ingredient: self.meals_for(ingredient) for ingredient in self._sorted}
+
+
+# -----------------------------
+# Single-Slot Changes
+# -----------------------------
+def set_meal(plan, day, category, meal, index=None):
+    """Put meal into one slot of plan in place, keeping index (a GroceryIndex) in step."""
+    previous = plan[day].get(category)
+    if index is not None:
+        if previous is not None:
+            index.remove(category, previous)
+        if meal is not None:
+            index.add(category, meal)
+    if meal is None:
+        plan[day].pop(category, None)
+    else:
+        plan[day][category] = meal
+    return previous
+
+
+@traced("meal_logic.swap_meal")
+def swap_meal(plan, day, category, catalog, index=None, rng=random):
+    """Replace one slot with a different meal from the category's ranked catalog list.
+
+    Prefers the same top-ranked pool the weekly planner samples from and skips
+    meals already used in that category this week. Returns the new meal, or
+    None when the catalog has nothing else to offer.
+    """
+    ranked = catalog.get(category, [])
+    used = {meals[category]["item_name"] for meals in plan.values() if category in meals}
+    pool = [m for m in ranked[:SAMPLE_POOL] if m["item_name"] not in used]
+    if not pool:
+        pool = [m for m in ranked if m["item_name"] not in used]
+    if not pool:
+        return None
+    meal = rng.choice(pool)
+    set_meal(plan, day, category, meal, index)
+    return meal
+
+
 # -----------------------------
 # Serialization
 # -----------------------------
@@ -94,10 +474,39 @@ def deserialize_weekly_plan(plan_json):
         day = int(day)
         weekly_plan[day] = {}
         for category, meal in meals.items():
-            weekly_plan[day][category] = {
-                "item_name": meal["item_name"],
-                "category": meal["category"],
-                "ingredients": set(meal["ingredients"]),
-                "notes": meal["notes"]
-            }
+            weekly_plan[day][category] = Meal(
+                None, meal["item_name"], meal["category"], meal["ingredients"], meal["notes"]
+            )
+    return weekly_plan
+
+
+def pack_weekly_plan(weekly_plan):
+    """Encode a plan as catalog meal ids only, or return None if a meal has no id."""
+    ids = []
+    for day in range(7):
+        meals = weekly_plan.get(day, {})
+        for category in CATEGORIES:
+            meal = meals.get(category)
+            if meal is not None and not meal.get("id"):
+                return None
+            ids.append(meal["id"] if meal is not None else 0)
+    return PLAN_SLOTS.pack(*ids)
+
+
+def unpack_weekly_plan(plan_meals, meals_by_id):
+    """Resolve a packed plan against the catalog; slots whose meal is gone stay empty."""
+    ids = PLAN_SLOTS.unpack(plan_meals)
+    weekly_plan = {day: {} for day in range(7)}
+    for slot, meal_id in enumerate(ids):
+        meal = meals_by_id.get(meal_id) if meal_id else None
+        if meal is not None:
+            day, c = divmod(slot, len(CATEGORIES))
+            weekly_plan[day][CATEGORIES[c]] = meal
     return weekly_plan
+
+
+def decode_saved_plan(plan_json, plan_meals, meals_by_id):
+    # Rows saved before the compact format keep their full JSON copy.
+    if plan_meals is not None:
+        return unpack_weekly_plan(plan_meals, meals_by_id)
+    return deserialize_weekly_plan(plan_json)
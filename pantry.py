@@ -0,0 +1,169 @@
+from collections import defaultdict
+
+from meal_logic import CATEGORIES, SAMPLE_POOL, parse_ingredients
+
+
+def normalize_pantry(pantry):
+    """Accept a comma-separated string or any iterable of ingredient names."""
+    if isinstance(pantry, str):
+        return frozenset(parse_ingredients(pantry))
+    return frozenset(i.strip().lower() for i in pantry if i and i.strip())
+
+
+# -----------------------------
+# Bitset Helpers
+# -----------------------------
+# A bitset is a Python int with bit p set for the meal at position p.
+def bitset(positions, size):
+    bits = bytearray((size + 7) // 8)
+    for p in positions:
+        bits[p >> 3] |= 1 << (p & 7)
+    return int.from_bytes(bits, "little")
+
+
+def iter_bits(bits):
+    # Walk bytes rather than shifting the whole int, which would cost O(size) per bit.
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for i, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield i * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+# -----------------------------
+# Inverted Ingredient Index
+# -----------------------------
+class PantryIndex:
+    """Ingredient -> meal bitsets for one list of meals.
+
+    Pantry hits are summed per meal in a bit-sliced counter: slice j holds bit
+    j of every meal's hit count, so adding an ingredient's posting bitset is a
+    ripple-carry add over a handful of big ints rather than a loop over meals.
+    "Missing at most k" is then a bitwise comparison of hits against each
+    meal-size class.
+    """
+
+    def __init__(self, meals):
+        self.meals = meals
+        self.size = len(meals)
+        self._postings = defaultdict(list)
+        self._names = defaultdict(list)
+        by_size = defaultdict(list)
+        for position, meal in enumerate(meals):
+            for ingredient in meal["ingredients"]:
+                self._postings[ingredient].append(position)
+            self._names[meal["item_name"]].append(position)
+            by_size[len(meal["ingredients"])].append(position)
+        self._by_size = {n: bitset(positions, self.size) for n, positions in by_size.items()}
+        self.max_size = max(by_size, default=0)
+        self.all = (1 << self.size) - 1
+
+    def posting(self, ingredient):
+        positions = self._postings.get(ingredient)
+        return bitset(positions, self.size) if positions else 0
+
+    def name_mask(self, item_name):
+        return sum(1 << p for p in self._names.get(item_name, ()))
+
+    # ---- bit-sliced hit counter ----
+    def counter(self, pantry=()):
+        slices = []
+        for ingredient in pantry:
+            self.add(slices, ingredient)
+        return slices
+
+    def add(self, slices, ingredient):
+        carry = self.posting(ingredient)
+        j = 0
+        while carry:
+            if j == len(slices):
+                slices.append(carry)
+                return
+            current = slices[j]
+            slices[j] = current ^ carry
+            carry = current & carry
+            j += 1
+
+    def at_least(self, slices, threshold):
+        """Bitset of meals whose hit count is >= threshold."""
+        if threshold <= 0:
+            return self.all
+        greater, equal = 0, self.all
+        for j in reversed(range(max(len(slices), threshold.bit_length()))):
+            current = slices[j] if j < len(slices) else 0
+            if threshold >> j & 1:
+                equal &= current
+            else:
+                greater |= equal & current
+                equal &= ~current
+            if not equal and not greater:
+                return 0
+        return greater | equal
+
+    def at_most_missing(self, slices, k):
+        """Bitset of meals with at most k ingredients not counted in slices."""
+        bits = 0
+        for n, members in self._by_size.items():
+            bits |= members & self.at_least(slices, n - k)
+        return bits
+
+    # ---- queries ----
+    def missing_at_most(self, pantry, k=0):
+        """Meals (in index order) missing at most k ingredients from pantry."""
+        slices = self.counter(normalize_pantry(pantry))
+        return [self.meals[p] for p in iter_bits(self.at_most_missing(slices, k))]
+
+    def coverable(self, pantry):
+        """Meals whose every ingredient is already in pantry."""
+        return self.missing_at_most(pantry, 0)
+
+
+def build_pantry_indexes(catalog):
+    return {category: PantryIndex(meals) for category, meals in catalog.items()}
+
+
+# -----------------------------
+# Pantry-First Planning
+# -----------------------------
+def build_pantry_plan(indexes, pantry, rng):
+    """Fill the week greedily, each slot preferring the meal with the fewest ingredients to buy.
+
+    Ingredients bought for earlier slots count as owned for later ones, so the
+    plan converges on a short shared grocery list. Among equally covered
+    meals the planner samples from the top-ranked few, as the default mode does.
+    """
+    owned = set(normalize_pantry(pantry))
+    counters = {category: index.counter(owned) for category, index in indexes.items()}
+    excluded = dict.fromkeys(indexes, 0)
+    weekly_plan = {day: {} for day in range(7)}
+
+    for day in range(7):
+        for category in CATEGORIES:
+            index = indexes.get(category)
+            if index is None:
+                continue
+            candidates = 0
+            for k in range(index.max_size + 1):
+                candidates = index.at_most_missing(counters[category], k) & ~excluded[category]
+                if candidates:
+                    break
+            if not candidates:
+                continue
+
+            pool = []
+            for p in iter_bits(candidates):
+                pool.append(p)
+                if len(pool) == SAMPLE_POOL:
+                    break
+            meal = index.meals[rng.choice(pool)]
+            weekly_plan[day][category] = meal
+            excluded[category] |= index.name_mask(meal["item_name"])
+
+            for ingredient in meal["ingredients"]:
+                if ingredient in owned:
+                    continue
+                owned.add(ingredient)
+                for other, other_index in indexes.items():
+                    other_index.add(counters[other], ingredient)
+    return weekly_plan
@@ -1,12 +1,22 @@
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
-)
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table
 from reportlab.lib.pagesizes import LETTER
-from reportlab.lib import colors
+from instrumentation import count, profiled, traced
 from meal_logic import build_ingredient_to_meals
+from pdf_styles import (
+    DAYS, MEAL_TABLE_STYLE, MEAL_TABLE_WIDTHS, STYLES, day_header, grocery_header, title_page
+)
 
 PDF_NAME = "Weekly_Meal_Plan.pdf"
+PDF_CACHE_SIZE = 32
+
+_pdf_cache = OrderedDict()
+_pdf_cache_lock = threading.Lock()
 
 
 # -------------------------------
@@ -19,71 +29,58 @@ def format_notes(notes):
     return notes
 
 
+# -------------------------------
+# Cache key: stable hash of the plan's printed content
+# -------------------------------
+def plan_hash(weekly_plan):
+    # Ingredients are sorted so set iteration order can't change the key.
+    canonical = {
+        str(day): {
+            category: [meal["item_name"], sorted(meal["ingredients"]), meal["notes"]]
+            for category, meal in meals.items()
+        }
+        for day, meals in weekly_plan.items()
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@profiled("pdf.generate_pdf")
 def generate_pdf(weekly_plan):
-    styles = getSampleStyleSheet()
-
-    # -------------------------
-    # Custom Styles
-    # -------------------------
-    styles.add(ParagraphStyle(
-        name="MainTitle",
-        fontSize=24,
-        spaceAfter=20,
-        alignment=1  # center
-    ))
-
-    styles.add(ParagraphStyle(
-        name="DayHeader",
-        fontSize=18,
-        spaceBefore=12,
-        spaceAfter=12,
-        textColor=colors.darkblue
-    ))
-
-    styles.add(ParagraphStyle(
-        name="MealHeader",
-        fontSize=13,
-        spaceAfter=6,
-        textColor=colors.HexColor("#2E4053")
-    ))
-
-    doc = SimpleDocTemplate(
-        PDF_NAME,
-        pagesize=LETTER,
-        rightMargin=40,
-        leftMargin=40,
-        topMargin=40,
-        bottomMargin=40,
-    )
-
-    content = []
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-
-    # -------------------------
-    # Title Page
-    # -------------------------
-    content.append(Paragraph("🍽 Weekly Meal Plan", styles["MainTitle"]))
-    content.append(Spacer(1, 12))
-
-    content.append(Paragraph("<b>Jump to Day</b>", styles["Heading2"]))
-    for i, day in enumerate(days):
-        content.append(Paragraph(f'• <a href="#day{i}">{day}</a>', styles["Normal"]))
-
-    content.append(PageBreak())
+    """Return the plan's PDF as bytes, reusing a cached render for identical plans."""
+    key = plan_hash(weekly_plan)
+    with _pdf_cache_lock:
+        pdf = _pdf_cache.get(key)
+        if pdf is not None:
+            _pdf_cache.move_to_end(key)
+            count("pdf.cache_hit")
+            return pdf
+
+    count("pdf.cache_miss")
+    pdf = render_pdf(weekly_plan)
+    with _pdf_cache_lock:
+        _pdf_cache[key] = pdf
+        while len(_pdf_cache) > PDF_CACHE_SIZE:
+            _pdf_cache.popitem(last=False)
+    return pdf
+
+
+@traced("pdf.build_story")
+def build_story(weekly_plan):
+    content = title_page()
 
     # -------------------------
     # Weekly Plan Pages
     # -------------------------
-    for i, day in enumerate(days):
-        content.append(Paragraph(f'<a name="day{i}"/>{day}', styles["DayHeader"]))
-        content.append(Spacer(1, 8))
+    for i in range(len(DAYS)):
+        content.extend(day_header(i))
 
         for category, meal in weekly_plan[i].items():
             # Meal title
             content.append(
                 Paragraph(
                     f"{category.capitalize()} — <b>{meal['item_name']}</b>",
-                    styles["MealHeader"]
+                    STYLES["MealHeader"]
                 )
             )
 
@@ -96,26 +93,10 @@ def generate_pdf(weekly_plan):
             table_data = [["Ingredients", ingredients]]
 
             if meal["notes"]:
-                table_data.append(["Notes", Paragraph(format_notes(meal["notes"]), styles["Normal"])])
-
-            table = Table(
-                table_data,
-                colWidths=[90, 400]
-            )
+                table_data.append(["Notes", Paragraph(format_notes(meal["notes"]), STYLES["Normal"])])
 
-            table.setStyle(TableStyle([
-                ("BACKGROUND", (0, 0), (0, -1), colors.whitesmoke),
-                ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
-                ("FONT", (0, 0), (0, -1), "Helvetica-Bold"),
-                ("FONT", (1, 0), (-1, -1), "Helvetica"),
-                ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.lightgrey),
-                ("BOX", (0, 0), (-1, -1), 0.5, colors.lightgrey),
-                ("LEFTPADDING", (0, 0), (-1, -1), 8),
-                ("RIGHTPADDING", (0, 0), (-1, -1), 8),
-                ("TOPPADDING", (0, 0), (-1, -1), 6),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-            ]))
+            table = Table(table_data, colWidths=MEAL_TABLE_WIDTHS)
+            table.setStyle(MEAL_TABLE_STYLE)
 
             content.append(table)
             content.append(Spacer(1, 14))
@@ -127,21 +108,35 @@ def generate_pdf(weekly_plan):
     # -------------------------
     ingredient_mapping = build_ingredient_to_meals(weekly_plan)
 
-    content.append(Paragraph("🛒 Grocery List", styles["DayHeader"]))
-    content.append(Spacer(1, 10))
+    content.extend(grocery_header())
 
     for ingredient in sorted(ingredient_mapping):
         meals = "; ".join(ingredient_mapping[ingredient])
         content.append(
             Paragraph(
                 f"☐ <b>{ingredient.title()}</b> <span color='grey'>({meals})</span>",
-                styles["Normal"]
+                STYLES["Normal"]
             )
         )
         content.append(Spacer(1, 6))
 
-    # -------------------------
-    # Build PDF
-    # -------------------------
+    return content
+
+
+@traced("pdf.build_document")
+def build_document(content):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=LETTER,
+        rightMargin=40,
+        leftMargin=40,
+        topMargin=40,
+        bottomMargin=40,
+    )
     doc.build(content)
-    return PDF_NAME
+    return buffer.getvalue()
+
+
+def render_pdf(weekly_plan):
+    return build_document(build_story(weekly_plan))
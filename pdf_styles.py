@@ -0,0 +1,90 @@
+import copy
+
+from reportlab.platypus import Paragraph, Spacer, PageBreak, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+
+# Styles, the table style and the parsed static paragraphs are built once per
+# process. ReportLab records layout state on flowable instances while building
+# a document, so renders get shallow copies of the static flowables: the parsed
+# markup is shared, the layout state is not.
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MEAL_TABLE_WIDTHS = [90, 400]
+
+# -------------------------
+# Paragraph Styles
+# -------------------------
+STYLES = getSampleStyleSheet()
+
+STYLES.add(ParagraphStyle(
+    name="MainTitle",
+    fontSize=24,
+    spaceAfter=20,
+    alignment=1  # center
+))
+
+STYLES.add(ParagraphStyle(
+    name="DayHeader",
+    fontSize=18,
+    spaceBefore=12,
+    spaceAfter=12,
+    textColor=colors.darkblue
+))
+
+STYLES.add(ParagraphStyle(
+    name="MealHeader",
+    fontSize=13,
+    spaceAfter=6,
+    textColor=colors.HexColor("#2E4053")
+))
+
+# -------------------------
+# Table Style (ingredients + notes per meal)
+# -------------------------
+MEAL_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (0, -1), colors.whitesmoke),
+    ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
+    ("FONT", (0, 0), (0, -1), "Helvetica-Bold"),
+    ("FONT", (1, 0), (-1, -1), "Helvetica"),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.lightgrey),
+    ("BOX", (0, 0), (-1, -1), 0.5, colors.lightgrey),
+    ("LEFTPADDING", (0, 0), (-1, -1), 8),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 8),
+    ("TOPPADDING", (0, 0), (-1, -1), 6),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+])
+
+# -------------------------
+# Static Flowables
+# -------------------------
+_TITLE_PAGE = (
+    Paragraph("🍽 Weekly Meal Plan", STYLES["MainTitle"]),
+    Spacer(1, 12),
+    Paragraph("<b>Jump to Day</b>", STYLES["Heading2"]),
+    *(Paragraph(f'• <a href="#day{i}">{day}</a>', STYLES["Normal"]) for i, day in enumerate(DAYS)),
+    PageBreak(),
+)
+
+_DAY_HEADERS = tuple(
+    (Paragraph(f'<a name="day{i}"/>{day}', STYLES["DayHeader"]), Spacer(1, 8))
+    for i, day in enumerate(DAYS)
+)
+
+_GROCERY_HEADER = (
+    Paragraph("🛒 Grocery List", STYLES["DayHeader"]),
+    Spacer(1, 10),
+)
+
+
+def title_page():
+    return [copy.copy(f) for f in _TITLE_PAGE]
+
+
+def day_header(day):
+    return [copy.copy(f) for f in _DAY_HEADERS[day]]
+
+
+def grocery_header():
+    return [copy.copy(f) for f in _GROCERY_HEADER]
@@ -1,3 +1,6 @@
+-- Schema version 1 (PRAGMA user_version). Later changes are migration steps
+-- in db.MIGRATIONS, applied on top of this file; see db.ensure_schema.
+
 CREATE TABLE IF NOT EXISTS meals (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     item_name TEXT NOT NULL,
@@ -6,9 +9,172 @@ CREATE TABLE IF NOT EXISTS meals (
     notes TEXT
 );
 
+CREATE INDEX IF NOT EXISTS idx_meals_item_name ON meals (item_name);
+
+-- Matches the normalized category expression used by db.fetch_meals filters.
+CREATE INDEX IF NOT EXISTS idx_meals_category ON meals (lower(trim(category)));
+
+-- New plans store only packed meal ids in plan_meals (see meal_logic.PLAN_SLOTS);
+-- plan_json holds the full copy for legacy rows that could not be converted.
+-- Version 2 adds plan_hash, a unique content hash (db.migrate_plan_hashes).
 CREATE TABLE IF NOT EXISTS saved_plans (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     name TEXT NOT NULL,
     created_at TEXT NOT NULL,
-    plan_json TEXT NOT NULL
+    plan_json TEXT,
+    plan_meals BLOB
+);
+
+CREATE INDEX IF NOT EXISTS idx_saved_plans_created_at
+    ON saved_plans (created_at DESC, id DESC);
+
+-- One row per filled slot of a packed saved plan, written alongside it, so
+-- recent meal history is an index range read instead of decoding plans.
+CREATE TABLE IF NOT EXISTS saved_plan_slots (
+    plan_id INTEGER NOT NULL REFERENCES saved_plans(id) ON DELETE CASCADE,
+    slot INTEGER NOT NULL,
+    meal_id INTEGER NOT NULL,
+    PRIMARY KEY (plan_id, slot)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_saved_plan_slots_meal ON saved_plan_slots (meal_id, plan_id);
+
+-- Per-meal totals over all saved plans, kept current by the slot triggers
+-- below, so analytics reports read one row per planned meal rather than
+-- every saved plan. slots counts filled slots, plans the distinct plans.
+CREATE TABLE IF NOT EXISTS meal_plan_stats (
+    meal_id INTEGER PRIMARY KEY,
+    slots INTEGER NOT NULL,
+    plans INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS saved_plan_slots_after_insert AFTER INSERT ON saved_plan_slots
+BEGIN
+    INSERT INTO meal_plan_stats (meal_id, slots, plans) VALUES (new.meal_id, 1, 1)
+    ON CONFLICT (meal_id) DO UPDATE SET
+        slots = slots + 1,
+        plans = plans + NOT EXISTS (
+            SELECT 1 FROM saved_plan_slots
+            WHERE plan_id = new.plan_id AND meal_id = new.meal_id AND slot != new.slot
+        );
+END;
+
+CREATE TRIGGER IF NOT EXISTS saved_plan_slots_after_delete AFTER DELETE ON saved_plan_slots
+BEGIN
+    UPDATE meal_plan_stats SET
+        slots = slots - 1,
+        plans = plans - NOT EXISTS (
+            SELECT 1 FROM saved_plan_slots WHERE plan_id = old.plan_id AND meal_id = old.meal_id
+        )
+    WHERE meal_id = old.meal_id;
+    DELETE FROM meal_plan_stats WHERE meal_id = old.meal_id AND slots <= 0;
+END;
+
+CREATE TABLE IF NOT EXISTS ingredients (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS meal_ingredients (
+    meal_id INTEGER NOT NULL REFERENCES meals(id) ON DELETE CASCADE,
+    ingredient_id INTEGER NOT NULL REFERENCES ingredients(id),
+    PRIMARY KEY (meal_id, ingredient_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_meal_ingredients_ingredient
+    ON meal_ingredients (ingredient_id, meal_id);
+
+-- Dietary and other labels (e.g. "vegetarian", "gluten-free") for filtering.
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS meal_tags (
+    meal_id INTEGER NOT NULL REFERENCES meals(id) ON DELETE CASCADE,
+    tag_id INTEGER NOT NULL REFERENCES tags(id),
+    PRIMARY KEY (meal_id, tag_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_meal_tags_tag ON meal_tags (tag_id, meal_id);
+
+-- Bumped by the triggers below whenever catalog data changes, so in-process
+-- caches can validate themselves with a single-row read.
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS meals_after_insert AFTER INSERT ON meals
+BEGIN UPDATE catalog_version SET version = version + 1; END;
+
+CREATE TRIGGER IF NOT EXISTS meals_after_update AFTER UPDATE ON meals
+BEGIN UPDATE catalog_version SET version = version + 1; END;
+
+CREATE TRIGGER IF NOT EXISTS meals_after_delete AFTER DELETE ON meals
+BEGIN UPDATE catalog_version SET version = version + 1; END;
+
+-- Links follow the ingredients text: an edit drops the meal's links and queues
+-- it here, and db.relink_meals rebuilds them from the new text before the
+-- catalog is next loaded.
+CREATE TABLE IF NOT EXISTS meals_relink (
+    meal_id INTEGER PRIMARY KEY
 );
+
+CREATE TRIGGER IF NOT EXISTS meals_after_update_ingredients AFTER UPDATE OF ingredients ON meals
+BEGIN
+    DELETE FROM meal_ingredients WHERE meal_id = old.id;
+    INSERT OR IGNORE INTO meals_relink (meal_id) VALUES (new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS meal_ingredients_after_insert AFTER INSERT ON meal_ingredients
+BEGIN UPDATE catalog_version SET version = version + 1; END;
+
+CREATE TRIGGER IF NOT EXISTS meal_ingredients_after_delete AFTER DELETE ON meal_ingredients
+BEGIN UPDATE catalog_version SET version = version + 1; END;
+
+CREATE TRIGGER IF NOT EXISTS ingredients_after_update AFTER UPDATE ON ingredients
+BEGIN UPDATE catalog_version SET version = version + 1; END;
+
+CREATE TRIGGER IF NOT EXISTS meal_tags_after_insert AFTER INSERT ON meal_tags
+BEGIN UPDATE catalog_version SET version = version + 1; END;
+
+CREATE TRIGGER IF NOT EXISTS meal_tags_after_delete AFTER DELETE ON meal_tags
+BEGIN UPDATE catalog_version SET version = version + 1; END;
+
+CREATE TRIGGER IF NOT EXISTS tags_after_update AFTER UPDATE ON tags
+BEGIN UPDATE catalog_version SET version = version + 1; END;
+
+-- Full-text search over the catalog. External content: rows live in meals and
+-- the triggers below keep the index in sync.
+CREATE VIRTUAL TABLE IF NOT EXISTS meals_fts USING fts5(
+    item_name,
+    ingredients,
+    notes,
+    content = 'meals',
+    content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS meals_fts_after_insert AFTER INSERT ON meals
+BEGIN
+    INSERT INTO meals_fts (rowid, item_name, ingredients, notes)
+    VALUES (new.id, new.item_name, new.ingredients, new.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS meals_fts_after_delete AFTER DELETE ON meals
+BEGIN
+    INSERT INTO meals_fts (meals_fts, rowid, item_name, ingredients, notes)
+    VALUES ('delete', old.id, old.item_name, old.ingredients, old.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS meals_fts_after_update AFTER UPDATE ON meals
+BEGIN
+    INSERT INTO meals_fts (meals_fts, rowid, item_name, ingredients, notes)
+    VALUES ('delete', old.id, old.item_name, old.ingredients, old.notes);
+    INSERT INTO meals_fts (rowid, item_name, ingredients, notes)
+    VALUES (new.id, new.item_name, new.ingredients, new.notes);
+END;
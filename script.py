@@ -1,229 +1,148 @@
-import sqlite3
+import argparse
+import os
+import re
 import random
-import json
-from collections import Counter
-from reportlab.lib.pagesizes import LETTER
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, ListFlowable, ListItem
-from reportlab.lib.styles import getSampleStyleSheet
+import statistics
+import time
 
-DB_PATH = "meals.db"
-OUTPUT_PDF = "Weekly_Meal_Plan.pdf"
-
-
-# --------------------------------
-# Database
-# --------------------------------
-def fetch_meals():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT item_name, category, ingredients, notes
-        FROM meals
-    """)
-
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-
-# --------------------------------
-# Ingredient Processing
-# --------------------------------
-def parse_ingredients(ingredient_string):
-    return {
-        i.strip().lower()
-        for i in ingredient_string.split(",")
-        if i.strip()
-    }
-
-
-# --------------------------------
-# Serialization Helpers (FIX)
-# --------------------------------
-def serialize_weekly_plan(weekly_plan):
-    """Convert sets → lists so JSON can handle them"""
-    serializable = {}
-
-    for day, meals in weekly_plan.items():
-        serializable[day] = {}
-        for category, meal in meals.items():
-            serializable[day][category] = {
-                "item_name": meal["item_name"],
-                "category": meal["category"],
-                "ingredients": list(meal["ingredients"]),
-                "notes": meal["notes"]
-            }
-
-    return serializable
-
-
-def deserialize_weekly_plan(plan_json):
-    """Convert lists → sets after loading"""
-    raw = json.loads(plan_json)
-    restored = {}
-
-    for day, meals in raw.items():
-        restored[int(day)] = {}
-        for category, meal in meals.items():
-            restored[int(day)][category] = {
-                "item_name": meal["item_name"],
-                "category": meal["category"],
-                "ingredients": set(meal["ingredients"]),
-                "notes": meal["notes"]
-            }
-
-    return restored
-
-
-# --------------------------------
-# Group Meals by Category
-# --------------------------------
-def group_meals_by_category(meals):
-    categorized = {}
-    for meal in meals:
-        categorized.setdefault(meal["category"].lower(), []).append(meal)
-    return categorized
-
-
-# --------------------------------
-# Optimized Meal Selection
-# --------------------------------
-def select_optimized_meals_for_category(meals, total=7):
-    if len(meals) < total:
-        raise ValueError(
-            f"Not enough meals in category. "
-            f"Needed {total}, found {len(meals)}"
-        )
-
-    ingredient_counter = Counter()
-    for meal in meals:
-        ingredient_counter.update(meal["ingredients"])
-
-    for meal in meals:
-        meal["score"] = sum(
-            ingredient_counter[i] for i in meal["ingredients"]
-        )
-
-    sorted_meals = sorted(meals, key=lambda x: x["score"], reverse=True)
-
-    if len(sorted_meals) == total:
-        return sorted_meals
-
-    pool = sorted_meals[:max(15, total)]
-    return random.sample(pool, total)
-
-
-# --------------------------------
-# Build Weekly Plan
-# --------------------------------
-def build_full_week_plan(db_meals):
-    meal_data = [{
-        "item_name": m[0],
-        "category": m[1].lower(),
-        "ingredients": parse_ingredients(m[2]),
-        "notes": m[3]
-    } for m in db_meals]
-
-    categorized = group_meals_by_category(meal_data)
-    required_categories = ["breakfast", "lunch", "dinner", "snack"]
-
-    weekly_plan = {day: {} for day in range(7)}
-
-    for category in required_categories:
-        selected = select_optimized_meals_for_category(
-            categorized.get(category, []),
-            total=7
-        )
-
-        for day in range(7):
-            weekly_plan[day][category] = selected[day]
-
-    return weekly_plan
-
-
-# --------------------------------
-# Grocery List
-# --------------------------------
-def build_grocery_list_from_week(weekly_plan):
-    ingredients = set()
-
-    for day in weekly_plan.values():
-        for meal in day.values():
-            ingredients.update(meal["ingredients"])
-
-    return sorted(ingredients)
-
-
-# --------------------------------
-# PDF Generation
-# --------------------------------
-def generate_pdf(weekly_plan, grocery_list):
-    doc = SimpleDocTemplate(OUTPUT_PDF, pagesize=LETTER)
-    styles = getSampleStyleSheet()
-    content = []
-
-    days = [
-        "Monday", "Tuesday", "Wednesday",
-        "Thursday", "Friday", "Saturday", "Sunday"
-    ]
-
-    content.append(
-        Paragraph("<b>Weekly Meal Plan</b>", styles["Title"])
+from catalog import get_catalog, get_meals_by_id
+from db import fetch_saved_plan, fetch_saved_plan_page
+from meal_logic import build_weekly_plan_from_catalog, decode_saved_plan
+
+# pdf_generator (and with it ReportLab) is imported only where a PDF is rendered.
+
+
+# --------------------------------
+# Batch Jobs
+# --------------------------------
+# A job is (filename, seed, saved_row): either a seed for a new plan or the
+# (plan_json, plan_meals) of a saved one. Jobs are small so they are cheap to
+# send to workers; the catalog goes to each worker once through the initializer.
+_worker_catalog = None
+_worker_meals_by_id = None
+
+
+def _init_worker(catalog, meals_by_id):
+    global _worker_catalog, _worker_meals_by_id
+    _worker_catalog = catalog
+    _worker_meals_by_id = meals_by_id
+
+
+def _render_job(out_dir, job):
+    from pdf_generator import render_pdf
+
+    filename, seed, saved_row = job
+    start = time.perf_counter()
+    if saved_row is None:
+        plan = build_weekly_plan_from_catalog(_worker_catalog, random.Random(seed))
+    else:
+        plan = decode_saved_plan(*saved_row, _worker_meals_by_id)
+    with open(os.path.join(out_dir, filename), "wb") as f:
+        f.write(render_pdf(plan))
+    return time.perf_counter() - start
+
+
+def slugify(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "plan"
+
+
+def generated_jobs(count, base_seed):
+    for k in range(count):
+        yield f"plan_{k + 1:05d}.pdf", base_seed + k, None
+
+
+def saved_jobs(limit=None):
+    # Walk saved plans page by page so only one page of ids is held at a time.
+    before = None
+    emitted = 0
+    while limit is None or emitted < limit:
+        page = fetch_saved_plan_page(before=before)
+        if not page:
+            return
+        for plan_id, name, created in page:
+            if limit is not None and emitted >= limit:
+                return
+            yield f"{plan_id}_{slugify(name)}.pdf", None, fetch_saved_plan(plan_id)
+            emitted += 1
+        before = (page[-1][2], page[-1][0])
+
+
+def run_batch(jobs, out_dir, workers):
+    """Render every job into out_dir; returns per-PDF latencies in seconds.
+
+    At most 2 * workers jobs are in flight, so memory stays flat however many
+    plans are rendered.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    catalog = get_catalog()
+    meals_by_id = get_meals_by_id()
+    latencies = []
+
+    if workers <= 1:
+        _init_worker(catalog, meals_by_id)
+        for job in jobs:
+            latencies.append(_render_job(out_dir, job))
+        return latencies
+
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(catalog, meals_by_id)) as executor:
+        pending = set()
+        for job in jobs:
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                latencies.extend(f.result() for f in done)
+            pending.add(executor.submit(_render_job, out_dir, job))
+        latencies.extend(f.result() for f in wait(pending).done)
+    return latencies
+
+
+def report(latencies, elapsed):
+    if not latencies:
+        print("No plans to render.")
+        return
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"✅ Rendered {len(ordered)} PDFs in {elapsed:.2f}s ({len(ordered) / elapsed:.1f} plans/sec)")
+    print(
+        f"⏱ Per-PDF latency: median {statistics.median(ordered) * 1000:.0f} ms, "
+        f"p95 {p95 * 1000:.0f} ms, max {ordered[-1] * 1000:.0f} ms"
     )
-    content.append(Spacer(1, 12))
-
-    for i, day_name in enumerate(days):
-        content.append(
-            Paragraph(f"<b>{day_name}</b>", styles["Heading2"])
-        )
-
-        for category in ["breakfast", "lunch", "dinner", "snack"]:
-            meal = weekly_plan[i][category]
-            content.append(
-                Paragraph(
-                    f"<b>{category.capitalize()}</b>: "
-                    f"{meal['item_name']}",
-                    styles["Normal"]
-                )
-            )
-
-        content.append(Spacer(1, 10))
-
-    content.append(Spacer(1, 20))
-    content.append(
-        Paragraph("<b>Weekly Grocery List</b>", styles["Title"])
-    )
-    content.append(Spacer(1, 12))
-
-    grocery_items = [
-        ListItem(Paragraph(item, styles["Normal"]))
-        for item in grocery_list
-    ]
-
-    content.append(
-        ListFlowable(grocery_items, bulletType="bullet")
-    )
-
-    doc.build(content)
 
 
 # --------------------------------
 # Main App
 # --------------------------------
-def main():
-    db_meals = fetch_meals()
-
-    weekly_plan = build_full_week_plan(db_meals)
-    grocery_list = build_grocery_list_from_week(weekly_plan)
-
-    # Optional: Save serialized plan (future-proof)
-    serialized_plan = serialize_weekly_plan(weekly_plan)
-
-    generate_pdf(weekly_plan, grocery_list)
-
-    print("✅ Weekly meal plan generated!")
-    print(f"📄 Saved as: {OUTPUT_PDF}")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate weekly meal plan PDFs.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--generate", type=int, metavar="N", help="render N newly generated plans")
+    source.add_argument("--saved", action="store_true", help="render saved plans")
+    parser.add_argument("--limit", type=int, help="with --saved, render at most this many plans")
+    parser.add_argument("--seed", type=int, default=0, help="base seed for --generate (default 0)")
+    parser.add_argument("--out", default="pdfs", help="output directory for batch modes (default pdfs)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="render processes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.generate is None and not args.saved:
+        from pdf_generator import PDF_NAME, render_pdf
+
+        weekly_plan = build_weekly_plan_from_catalog(get_catalog())
+        with open(PDF_NAME, "wb") as f:
+            f.write(render_pdf(weekly_plan))
+        print("✅ Weekly meal plan generated!")
+        print(f"📄 Saved as: {PDF_NAME}")
+        return
+
+    jobs = generated_jobs(args.generate, args.seed) if not args.saved else saved_jobs(args.limit)
+    start = time.perf_counter()
+    latencies = run_batch(jobs, args.out, args.workers)
+    report(latencies, time.perf_counter() - start)
+    print(f"📁 Output directory: {args.out}")
 
 
 if __name__ == "__main__":
@@ -1,14 +1,26 @@
 import streamlit as st
 import json
-from db import fetch_meals, fetch_saved_plans, save_weekly_plan
-from meal_logic import build_weekly_plan, deserialize_weekly_plan, build_ingredient_to_meals
-from pdf_generator import generate_pdf
+import instrumentation
+from catalog import catalog_stats, get_catalog, get_meals_by_id, get_plan, new_seed
+from db import (
+    HISTORY_WINDOW, SAVED_PLANS_PAGE_SIZE, fetch_ingredient_names, fetch_recent_meal_ids, fetch_saved_plan,
+    fetch_saved_plan_page, fetch_tag_names, meal_filters, queue_weekly_plan, search_meals
+)
+from meal_logic import (
+    build_multi_week_plan_from_catalog, copy_plan, decode_saved_plan, parse_ingredients,
+    serialize_weekly_plan, GroceryIndex, MealHistory, set_meal, swap_meal
+)
 
 st.set_page_config(page_title="Weekly Meal Planner", layout="wide")
 
-# Load CSS
-with open("styles.css") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+# Load CSS (read from disk once per process, not on every rerun)
+@st.cache_resource
+def load_css():
+    with open("styles.css") as f:
+        return f"<style>{f.read()}</style>"
+
+
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # ===============================
 # Landing Header
@@ -22,92 +34,228 @@ st.markdown("""
 
 
 days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+meal_icons = [("breakfast", "🍳"), ("lunch", "🥗"), ("dinner", "🍝"), ("snack", "🍎")]
 
-# Initialize weekly plan
-if "weekly_plan" not in st.session_state:
-    st.session_state.weekly_plan = build_weekly_plan(fetch_meals())
 
-weekly_plan = st.session_state.weekly_plan
+# Query parameters that reproduce a generated week: ?seed=...&pantry=...&exclude=...&tags=...
+SHARE_PARAMS = ("seed", "pantry", "exclude", "tags")
+
+
+def share_plan(seed):
+    # A seeded plan is deterministic for the catalog version, so the URL is enough to rebuild it.
+    for param in SHARE_PARAMS:
+        st.query_params.pop(param, None)
+    if seed is None:
+        return
+    st.query_params["seed"] = str(seed)
+    if st.session_state.get("pantry"):
+        st.query_params["pantry"] = ",".join(sorted(current_pantry()))
+    if st.session_state.get("exclude_ingredients"):
+        st.query_params["exclude"] = ",".join(st.session_state.exclude_ingredients)
+    if st.session_state.get("required_tags"):
+        st.query_params["tags"] = ",".join(st.session_state.required_tags)
+
+
+def set_weekly_plan(plan, seed=None):
+    # The grocery index follows the plan; single-slot swaps update both in place.
+    st.session_state.weekly_plan = plan
+    st.session_state.grocery_index = GroceryIndex(plan)
+    st.session_state.plan_revision = st.session_state.get("plan_revision", 0) + 1
+    st.session_state.plan_seed = seed
+    share_plan(seed)
+
+
+def show_planned_week(index):
+    # A copy, so swaps and pins on the shown week leave the planned one intact.
+    st.session_state.planned_week = index
+    set_weekly_plan(copy_plan(st.session_state.planned_weeks[index]))
+
+
+def generate_week(seed=None):
+    seed = new_seed() if seed is None else seed
+    set_weekly_plan(get_plan(seed, current_filters(), current_pantry()), seed)
+
+
+def plan_edited():
+    # Once a slot changes the seed no longer describes the plan.
+    st.session_state.plan_revision += 1
+    if st.session_state.get("plan_seed") is not None:
+        st.session_state.plan_seed = None
+        share_plan(None)
+
+
+def swap_slot(day, category):
+    meal = swap_meal(
+        st.session_state.weekly_plan, day, category,
+        get_catalog(current_filters()), st.session_state.grocery_index,
+    )
+    if meal is not None:
+        plan_edited()
+
+
+def pin_meal(day, category, meal):
+    set_meal(st.session_state.weekly_plan, day, category, meal, st.session_state.grocery_index)
+    plan_edited()
+
+
+def current_pantry():
+    return parse_ingredients(st.session_state.get("pantry", ""))
+
+
+def current_filters():
+    # Filters are applied in SQLite; each distinct set gets its own cached catalog.
+    return meal_filters(
+        exclude_ingredients=st.session_state.get("exclude_ingredients", ()),
+        tags=st.session_state.get("required_tags", ()),
+    )
+
+
+def restore_shared_options():
+    split = lambda param: [v for v in st.query_params.get(param, "").split(",") if v]
+    st.session_state.pantry = ", ".join(split("pantry"))
+    known = set(fetch_ingredient_names())
+    st.session_state.exclude_ingredients = [i for i in split("exclude") if i in known]
+    known = set(fetch_tag_names())
+    st.session_state.required_tags = [t for t in split("tags") if t in known]
+
+
+# Initialize weekly plan, from a shared link when there is one
+if "weekly_plan" not in st.session_state:
+    shared_seed = st.query_params.get("seed", "")
+    if shared_seed.isdigit():
+        restore_shared_options()
+        generate_week(int(shared_seed))
+    else:
+        generate_week()
 
 # ===============================
 # Sidebar
 # ===============================
 st.sidebar.header("Actions")
+st.sidebar.text_area(
+    "🥫 In my pantry",
+    key="pantry",
+    placeholder="rice, eggs, onion",
+    help="New weeks favour meals you can cook with these; they are left off the grocery list.",
+)
+with st.sidebar.expander("🥗 Dietary filters"):
+    st.multiselect("Never include", fetch_ingredient_names(), key="exclude_ingredients", format_func=str.title)
+    tag_names = fetch_tag_names()
+    if tag_names:
+        st.multiselect("Only meals tagged", tag_names, key="required_tags", format_func=str.title)
 if st.sidebar.button("🔄 Generate New Week"):
-    st.session_state.weekly_plan = build_weekly_plan(fetch_meals())
+    generate_week()
+    st.session_state.pop("planned_weeks", None)
+if st.session_state.get("plan_seed") is not None:
+    st.sidebar.caption(f"🔗 Week #{st.session_state.plan_seed}: share this page's URL to show the same plan.")
+
+with st.sidebar.expander("🗓 Plan ahead"):
+    weeks = st.number_input("Weeks", min_value=2, max_value=13, value=4)
+    st.caption(f"Skips meals from your last {HISTORY_WINDOW} saved weeks and from each other.")
+    if st.button("Plan weeks", use_container_width=True):
+        # History comes from the saved-plan slot index; nothing is decoded.
+        history = MealHistory(HISTORY_WINDOW, reversed(fetch_recent_meal_ids(HISTORY_WINDOW)))
+        st.session_state.planned_weeks = build_multi_week_plan_from_catalog(
+            get_catalog(current_filters()), weeks, history
+        )
+        show_planned_week(0)
+    if "planned_weeks" in st.session_state:
+        st.selectbox(
+            "Showing",
+            range(len(st.session_state.planned_weeks)),
+            format_func=lambda i: f"Week {i + 1}",
+            key="planned_week",
+            on_change=lambda: show_planned_week(st.session_state.planned_week),
+        )
 
 plan_name = st.sidebar.text_input("Save this week as")
 if st.sidebar.button("⭐ Save Week") and plan_name:
-    save_weekly_plan(plan_name, st.session_state.weekly_plan)
-    st.sidebar.success("Saved!")
+    # Written by the background save queue; report_saves() shows the outcome once acknowledged.
+    pending_saves = st.session_state.setdefault("pending_saves", [])
+    pending_saves.append((plan_name, queue_weekly_plan(plan_name, st.session_state.weekly_plan)))
+save_status = st.sidebar.container()
 
 if st.sidebar.button("📄 Download PDF"):
+    # ReportLab is only loaded once someone actually asks for a PDF.
+    from pdf_generator import PDF_NAME, generate_pdf
+
     pdf = generate_pdf(st.session_state.weekly_plan)
-    with open(pdf, "rb") as f:
-        st.sidebar.download_button("⬇️ Download", f, file_name=pdf)
+    st.sidebar.download_button("⬇️ Download", pdf, file_name=PDF_NAME, mime="application/pdf")
 
 
 # ===============================
-# Tab Rendering Functions
+# Weekly Grid HTML
 # ===============================
-def render_weekly_plan_tab(weekly_plan):
-    st.markdown("<br><br>", unsafe_allow_html=True)
+def render_meal_card(category, icon, meal):
+    if meal:
+        ingredients = ", ".join(sorted(meal["ingredients"]))
+        notes = f'<a href="{meal["notes"]}" target="_blank">🔗 Recipe</a>' if meal["notes"] else "No notes"
+        front = f'<span class="meal-icon">{icon}</span>{category.capitalize()}<br/><small>{meal["item_name"]}</small>'
+        back = f"<b>Ingredients</b><br>{ingredients.title()}<br><br>{notes}"
+    else:
+        front = f"{category.capitalize()}<br/>—"
+        back = "No meal"
+    return (
+        f'<div class="flip-card {category}"><label>'
+        f'<input type="checkbox" class="flip-toggle">'
+        f'<div class="flip-card-inner">'
+        f'<div class="flip-card-front">{front}</div>'
+        f'<div class="flip-card-back">{back}</div>'
+        f"</div></label></div>"
+    )
+
+
+def build_week_html(weekly_plan):
+    parts = []
     for i, day in enumerate(days):
-            st.markdown(f'<div class="day-card"><div class="day-title">{day}</div><div class="meal-grid">', unsafe_allow_html=True)
-
-            for category, icon in [
-                    ("breakfast", "🍳"),
-                    ("lunch", "🥗"),
-                    ("dinner", "🍝"),
-                    ("snack", "🍎"),
-                ]:
-                meal = weekly_plan[i].get(category)
-                if meal:
-                    ingredients = ", ".join(sorted(meal["ingredients"]))
-                    notes = f'<a href="{meal["notes"]}" target="_blank">🔗 Recipe</a>' if meal["notes"] else "No notes"
-                    st.markdown(f"""
-                        <div class="flip-card {category}">
-                            <label>
-                                <input type="checkbox" class="flip-toggle">
-                                <div class="flip-card-inner">
-                                    <div class="flip-card-front">
-                                        <span class="meal-icon">{icon}</span>
-                                        {category.capitalize()}<br/><small>{meal["item_name"]}</small>
-                                    </div>
-                                    <div class="flip-card-back">
-                                        <b>Ingredients</b><br>{ingredients.title()}<br><br>{notes}
-                                    </div>
-                                </div>
-                            </label>
-                        </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                        <div class="flip-card {category}">
-                            <label>
-                                <input type="checkbox" class="flip-toggle">
-                                <div class="flip-card-inner">
-                                    <div class="flip-card-front">
-                                        {category.capitalize()}<br/>—
-                                    </div>
-                                    <div class="flip-card-back">
-                                        No meal
-                                    </div>
-                                </div>
-                            </label>
-                        </div>
-                    """, unsafe_allow_html=True)
-
-            st.markdown("</div></div>", unsafe_allow_html=True)
-
-
-def render_grocery_list_tab(weekly_plan):
-    ingredient_mapping = build_ingredient_to_meals(weekly_plan)
-    grocery = sorted(ingredient_mapping.keys())
+        parts.append(f'<div class="day-card"><div class="day-title">{day}</div><div class="meal-grid">')
+        for category, icon in meal_icons:
+            parts.append(render_meal_card(category, icon, weekly_plan[i].get(category)))
+        parts.append("</div></div>")
+    return "".join(parts)
+
+
+def week_html():
+    # One HTML block per plan revision; swaps and new plans bump the revision.
+    cached = st.session_state.get("week_html")
+    if cached is None or cached[0] != st.session_state.plan_revision:
+        cached = (st.session_state.plan_revision, build_week_html(st.session_state.weekly_plan))
+        st.session_state.week_html = cached
+    return cached[1]
+
+
+# ===============================
+# Tab Rendering Functions
+# ===============================
+# Each tab is a fragment, so its widgets rerun only that tab. Actions that
+# change the plan itself trigger a full rerun so every tab sees the new plan.
+@st.fragment
+def render_weekly_plan_tab():
+    day_col, category_col, button_col = st.columns([2, 2, 1], vertical_alignment="bottom")
+    day = day_col.selectbox("Day", range(len(days)), format_func=days.__getitem__, key="swap_day")
+    category = category_col.selectbox(
+        "Meal", [c for c, _ in meal_icons], format_func=str.capitalize, key="swap_category"
+    )
+    if button_col.button("🔁 Swap meal", use_container_width=True):
+        swap_slot(day, category)
+        st.rerun()
+
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown(week_html(), unsafe_allow_html=True)
+
+
+@st.fragment
+def render_grocery_list_tab():
+    grocery_index = st.session_state.grocery_index
+    pantry = current_pantry()
+    grocery = [ingredient for ingredient in grocery_index.grocery_list() if ingredient not in pantry]
 
     # 🧠 UI Header
     st.subheader("🛒 Grocery List")
     st.caption("Check items as you shop or bulk-select below")
+    in_pantry = len(grocery_index.grocery_list()) - len(grocery)
+    if in_pantry:
+        st.caption(f"🥫 {in_pantry} ingredient{'s' if in_pantry != 1 else ''} already in your pantry")
 
     # ---- Controls Row ----
     control_col1, control_col2, control_col3 = st.columns([1, 1, 2])
@@ -133,7 +281,7 @@ def render_grocery_list_tab(weekly_plan):
         key = f"grocery_{ingredient}"
         ingredient_label = ingredient.title()  # ✨ Capitalized
         if show_meals:
-            meals = "; ".join(ingredient_mapping[ingredient])
+            meals = "; ".join(grocery_index.meals_for(ingredient))
             label = f"{ingredient_label}  \n*{meals}*"
         else:
             label = ingredient_label
@@ -143,24 +291,197 @@ def render_grocery_list_tab(weekly_plan):
         )
 
 
+def load_saved_plan(plan_id):
+    return decode_saved_plan(*fetch_saved_plan(plan_id), get_meals_by_id())
+
+
+@st.fragment
 def render_saved_weeks_tab():
-    plans = fetch_saved_plans()
-    if not plans:
+    if st.session_state.pop("plan_loaded", False):
+        st.success("Meal plan loaded!")
+
+    # Keyset cursors of the pages visited so far; the last one is the current page.
+    cursors = st.session_state.setdefault("saved_page_cursors", [None])
+    plans = fetch_saved_plan_page(before=cursors[-1])
+    if not plans and len(cursors) == 1:
         st.info("No saved meal plans yet.")
         return
 
-    for plan_id, name, created, plan_json in plans:
+    for plan_id, name, created in plans:
         with st.expander(f"{name} ({created[:10]})"):
+            # Plan bodies are only fetched and decoded on demand.
             if st.button("📥 Show this plan", key=f"load_{plan_id}"):
-                st.session_state.weekly_plan = deserialize_weekly_plan(plan_json)
-                st.success("Meal plan loaded!")
-            st.json(json.loads(plan_json))
+                set_weekly_plan(load_saved_plan(plan_id))
+                st.session_state.plan_loaded = True
+                st.rerun()
+            if st.toggle("Preview", key=f"preview_{plan_id}"):
+                st.json(serialize_weekly_plan(load_saved_plan(plan_id)))
+
+    newer_col, older_col = st.columns(2)
+    newer_col.button(
+        "⬅️ Newer",
+        disabled=len(cursors) == 1,
+        on_click=cursors.pop,
+        use_container_width=True,
+    )
+    older_col.button(
+        "Older ➡️",
+        disabled=len(plans) < SAVED_PLANS_PAGE_SIZE,
+        on_click=cursors.append,
+        args=((plans[-1][2], plans[-1][0]) if plans else None,),
+        use_container_width=True,
+    )
+
+
+@st.fragment
+def render_search_tab():
+    query = st.text_input("Search meals by name, ingredient or notes", key="search_query")
+    if not query.strip():
+        st.caption("Type part of a meal name or ingredient, e.g. \"chick pas\".")
+        return
+
+    meals_by_id = get_meals_by_id()
+    results = [meals_by_id[meal_id] for meal_id, _, _ in search_meals(query) if meal_id in meals_by_id]
+    if not results:
+        st.info("No meals found.")
+        return
+
+    categories = [c for c, _ in meal_icons]
+    for meal in results:
+        with st.container(border=True):
+            info_col, day_col, category_col, pin_col = st.columns([4, 2, 2, 1], vertical_alignment="bottom")
+            info_col.markdown(
+                f"**{meal['item_name']}** · {meal['category'].capitalize()}  \n"
+                f"*{', '.join(sorted(meal['ingredients'])).title()}*"
+            )
+            day = day_col.selectbox("Day", range(len(days)), format_func=days.__getitem__, key=f"pin_day_{meal['id']}")
+            category = category_col.selectbox(
+                "Slot",
+                categories,
+                index=categories.index(meal["category"]) if meal["category"] in categories else 0,
+                format_func=str.capitalize,
+                key=f"pin_category_{meal['id']}",
+            )
+            if pin_col.button("📌 Pin", key=f"pin_{meal['id']}", use_container_width=True):
+                pin_meal(day, category, meal)
+                st.session_state.pinned = f"Pinned {meal['item_name']} to {days[day]} {category}."
+                st.rerun()
+
+
+@st.fragment
+def render_insights_tab():
+    # Altair, pandas and the report queries only load once the dashboard is switched on.
+    if not st.toggle("Show insights across all saved weeks", key="show_insights"):
+        st.caption("Most-planned meals, ingredient demand and category balance over every saved week.")
+        return
+
+    import altair as alt
+    import pandas as pd
+    import analytics
+
+    plans, slots, meals = analytics.plan_totals()
+    if not slots:
+        st.info("Save a week to see insights.")
+        return
+    plans_col, slots_col, meals_col = st.columns(3)
+    plans_col.metric("Saved weeks", f"{plans:,}")
+    slots_col.metric("Planned meals", f"{slots:,}")
+    meals_col.metric("Different meals", f"{meals:,}")
+
+    top = pd.DataFrame(
+        analytics.most_planned_meals(), columns=["id", "meal", "category", "slots", "weeks"]
+    )
+    # Item names are not unique; keep same-named meals on separate bars.
+    repeated = top["meal"].duplicated(keep=False)
+    top.loc[repeated, "meal"] += " #" + top.loc[repeated, "id"].astype(str)
+    st.subheader("Most planned meals")
+    st.altair_chart(alt.Chart(top).mark_bar().encode(
+        x=alt.X("slots:Q", title="Times planned"),
+        y=alt.Y("meal:N", sort="-x", title=None),
+        color=alt.Color("category:N", title="Category"),
+        tooltip=["meal", "category", "slots", "weeks"],
+    ), use_container_width=True)
+
+    demand = pd.DataFrame(analytics.ingredient_demand(), columns=["ingredient", "slots", "meals"])
+    balance = pd.DataFrame(analytics.category_balance(), columns=["category", "slots", "meals"])
+    demand_col, balance_col = st.columns([3, 2])
+    with demand_col:
+        st.subheader("Ingredient demand")
+        st.altair_chart(alt.Chart(demand).mark_bar().encode(
+            x=alt.X("slots:Q", title="Planned meals using it"),
+            y=alt.Y("ingredient:N", sort="-x", title=None),
+            tooltip=["ingredient", "slots", "meals"],
+        ), use_container_width=True)
+    with balance_col:
+        st.subheader("Category balance")
+        st.altair_chart(alt.Chart(balance).mark_arc(innerRadius=50).encode(
+            theta=alt.Theta("slots:Q"),
+            color=alt.Color("category:N", title="Category"),
+            tooltip=["category", "slots", "meals"],
+        ), use_container_width=True)
 
 
 # ===============================
 # Render Tabs
 # ===============================
-tab1, tab2, tab3 = st.tabs(["📆 Weekly Plan", "🛒 Grocery List", "⭐ Saved Weeks"])
-with tab1: render_weekly_plan_tab(weekly_plan)
-with tab2: render_grocery_list_tab(weekly_plan)
+if "pinned" in st.session_state:
+    st.toast(st.session_state.pop("pinned"))
+
+tab1, tab2, tab3, tab4, tab5 = st.tabs(
+    ["📆 Weekly Plan", "🛒 Grocery List", "⭐ Saved Weeks", "🔍 Search", "📊 Insights"]
+)
+with tab1: render_weekly_plan_tab()
+with tab2: render_grocery_list_tab()
 with tab3: render_saved_weeks_tab()
+with tab4: render_search_tab()
+with tab5: render_insights_tab()
+
+
+# Rendered last so the background writer has had the rest of the run to commit.
+def report_saves():
+    still_pending = []
+    for name, future in st.session_state.get("pending_saves", []):
+        if not future.done():
+            still_pending.append((name, future))
+        elif future.exception() is not None:
+            save_status.error(f"Could not save “{name}”: {future.exception()}")
+        elif future.result().created:
+            save_status.success("Saved!")
+        else:
+            save_status.info(f"This week is already saved as “{future.result().name}”.")
+    if still_pending:
+        save_status.caption(f"💾 Saving {len(still_pending)} week{'s' if len(still_pending) != 1 else ''}…")
+    st.session_state.pending_saves = still_pending
+
+
+report_saves()
+
+
+# ===============================
+# Diagnostics (hidden; open with ?diagnostics=1)
+# ===============================
+def render_diagnostics():
+    snapshot = instrumentation.snapshot()
+    with st.expander("🩺 Diagnostics", expanded=True):
+        if not snapshot["enabled"]:
+            st.caption(
+                "Instrumentation is off. Start the app with MEAL_PLANNER_TRACE=1 "
+                "(and MEAL_PLANNER_PROFILE=1 for cProfile captures) to record spans."
+            )
+        st.write("Catalog cache", catalog_stats())
+        summary = sorted(snapshot["summary"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        st.dataframe([{"span": name, **stats} for name, stats in summary], use_container_width=True)
+        st.write("Counters", snapshot["counters"])
+        for profile in reversed(snapshot["profiles"]):
+            st.caption(f"cProfile: {profile['name']} ({profile['total_ms']:.1f} ms)")
+            st.code(profile["stats"])
+        st.download_button(
+            "⬇️ Download diagnostics JSON",
+            json.dumps(snapshot, indent=2),
+            file_name="diagnostics.json",
+            mime="application/json",
+        )
+
+
+if st.query_params.get("diagnostics") == "1":
+    render_diagnostics()